@@ -0,0 +1,128 @@
+"""
+Authentication backend that serves request.user from the cache.
+
+Django's ModelBackend loads the user with one query on every authenticated
+request, and templates that show the avatar (partials/navbar.html) pay a
+second one for user.profile. CachedModelBackend caches the user together
+with its profile, so with cached_db sessions an authenticated page needs no
+session, user or profile query while the entry is warm.
+
+Only the fields request handling reads are cached (USER_FIELDS,
+PROFILE_FIELDS), never the password hash. The rebuilt user has the other
+fields deferred, so reading them costs a query and saving it leaves the
+password alone. The session check uses the session auth hash cached with
+the entry.
+
+Saving or deleting a User or UserProfile drops the entry (see signals.py),
+and so does storing avatar variants (apps.blog.images). A password change
+also bumps the user's key version, so an entry cached under the old
+password is never read again. The timeout bounds staleness from any other
+queryset update that bypasses signals.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.fields.files import FieldFile
+
+from .models import UserProfile
+
+KEY_PREFIX = 'accounts:user'
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email', 'is_active', 'is_staff', 'is_superuser')
+PROFILE_FIELDS = ('id', 'user_id', 'avatar', 'avatar_variants')
+
+
+def _version_key(user_id):
+    return f'{KEY_PREFIX}:version:{user_id}'
+
+
+def _version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Never reuse a version if the key is evicted and recreated
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def cache_key(user_id):
+    return f'{KEY_PREFIX}:{user_id}:{_version(user_id)}'
+
+
+def load_user(user_id):
+    """The user with its profile preloaded, or None; one query"""
+    return User._default_manager.select_related('profile').filter(pk=user_id).first()
+
+
+def invalidate(user_id):
+    cache.delete(cache_key(user_id))
+
+
+def bump_version(user_id):
+    """Retire every entry cached for the user, e.g. after a password change"""
+    cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def _values(instance, names):
+    values = [getattr(instance, name) for name in names]
+    # Files as their stored names, so the entry holds plain data only
+    return [value.name if isinstance(value, FieldFile) else value for value in values]
+
+
+def _from_values(model, names, values):
+    """A model instance with only the given fields loaded"""
+    loaded = dict(zip(names, values))
+    attnames = [field.attname for field in model._meta.concrete_fields if field.attname in loaded]
+    return model.from_db(DEFAULT_DB_ALIAS, attnames, [loaded[name] for name in attnames])
+
+
+def _use_cached_session_hash(user, session_hash):
+    def get_session_auth_hash():
+        if 'password' in user.__dict__:
+            # The password was loaded (and maybe changed) since; hash it as usual
+            return User.get_session_auth_hash(user)
+        return session_hash
+    user.get_session_auth_hash = get_session_auth_hash
+
+
+def to_entry(user):
+    """The cacheable part of a user: plain values, without the password hash"""
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile = None
+    return {
+        'user': _values(user, USER_FIELDS),
+        'profile': None if profile is None else _values(profile, PROFILE_FIELDS),
+        'session_hash': user.get_session_auth_hash(),
+    }
+
+
+def from_entry(entry):
+    user = _from_values(User, USER_FIELDS, entry['user'])
+    if entry['profile'] is None:
+        User.profile.related.set_cached_value(user, None)
+    else:
+        profile = _from_values(UserProfile, PROFILE_FIELDS, entry['profile'])
+        user.profile = profile
+    _use_cached_session_hash(user, entry['session_hash'])
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = load_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, to_entry(user), settings.AUTH_USER_CACHE_TIMEOUT)
+        else:
+            user = from_entry(entry)
+        return user if self.user_can_authenticate(user) else None
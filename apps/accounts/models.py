@@ -1,3 +1,5 @@
+import copy
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -6,9 +8,28 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     bio = models.TextField(blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized copies, maintained by apps.blog.images')
     is_newsletter_subscribed = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Fields save_user_profile checks for changes made through user.profile
+    TRACKED_FIELDS = ('bio', 'avatar', 'avatar_variants', 'is_newsletter_subscribed')
+
     def __str__(self):
         return f'{self.user.username} Profile'
+
+    def _tracked_values(self):
+        values = {}
+        for name in self.TRACKED_FIELDS:
+            if name in self.__dict__:  # skip deferred fields
+                value = self.__dict__[name]
+                values[name] = copy.deepcopy(getattr(value, 'name', value))
+        return values
+
+    def remember_loaded_values(self):
+        self._loaded_values = self._tracked_values()
+
+    def changed_fields(self):
+        loaded = getattr(self, '_loaded_values', {})
+        return [name for name, value in self._tracked_values().items() if loaded.get(name) != value]
@@ -1,6 +1,9 @@
-from django.db.models.signals import post_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
+from apps.blog import images
+from . import backends
 from .models import UserProfile
 
 
@@ -13,6 +16,66 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    """Save the user profile when the user is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+    """Save changes made through user.profile when the user is saved"""
+    # Only a profile already loaded on this user can have changes; don't query for one
+    if not User.profile.is_cached(instance):
+        return
+    try:
+        profile = instance.profile
+    except UserProfile.DoesNotExist:
+        return
+    if profile.pk is None:
+        profile.save()
+        return
+    changed = profile.changed_fields()
+    if changed:
+        profile.save(update_fields=changed + ['updated_at'])
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_avatar(sender, instance, **kwargs):
+    value = instance.__dict__.get('avatar')
+    instance._loaded_avatar = getattr(value, 'name', value) or ''
+    instance.remember_loaded_values()
+
+
+@receiver(post_init, sender=User)
+def remember_password(sender, instance, **kwargs):
+    # Absent when deferred, as on users rebuilt from the cache
+    instance._loaded_password = instance.__dict__.get('password')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    password = instance.__dict__.get('password')
+    if password is not None and password != instance._loaded_password:
+        backends.bump_version(instance.pk)
+        instance._loaded_password = password
+    else:
+        backends.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    instance.remember_loaded_values()
+    backends.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def render_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    """Resize a new or replaced avatar in the background"""
+    if update_fields and 'avatar' not in update_fields:
+        return
+    name = instance.avatar.name or ''
+    if name != instance._loaded_avatar:
+        images.schedule(instance, 'avatar', 'avatar_variants', settings.AVATAR_WIDTHS)
+    instance._loaded_avatar = name
+
+
+@receiver(images.variants_stored, sender=UserProfile)
+def invalidate_avatar_user(sender, pk, **kwargs):
+    user_id = UserProfile.objects.filter(pk=pk).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        backends.invalidate(user_id)
@@ -0,0 +1,51 @@
+import pickle
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.accounts import backends
+from apps.accounts.models import UserProfile
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='old-password', first_name='Rea')
+        UserProfile.objects.filter(user=self.user).update(avatar='avatars/reader.jpg')
+        self.backend = backends.CachedModelBackend()
+
+    def cached_entry(self):
+        return cache.get(backends.cache_key(self.user.pk))
+
+    def test_cache_holds_no_password(self):
+        self.backend.get_user(self.user.pk)
+        entry = self.cached_entry()
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(entry))
+        self.assertNotIn(b'pbkdf2', pickle.dumps(entry))
+
+    def test_cached_user_serves_requests_without_queries(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual((user.username, user.first_name), ('reader', 'Rea'))
+            self.assertEqual(user.profile.avatar.name, 'avatars/reader.jpg')
+            self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+
+    def test_saving_a_cached_user_keeps_the_password(self):
+        self.backend.get_user(self.user.pk)
+        user = self.backend.get_user(self.user.pk)
+        user.first_name = 'Reader'
+        user.save()
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password('old-password'))
+
+    def test_password_change_retires_cached_entries(self):
+        self.backend.get_user(self.user.pk)
+        old_key = backends.cache_key(self.user.pk)
+        user = self.backend.get_user(self.user.pk)
+        user.set_password('new-password')
+        user.save()
+        self.assertNotEqual(backends.cache_key(self.user.pk), old_key)
+        fresh = self.backend.get_user(self.user.pk)
+        self.assertEqual(fresh.get_session_auth_hash(), User.objects.get(pk=self.user.pk).get_session_auth_hash())
+        self.assertEqual(user.get_session_auth_hash(), fresh.get_session_auth_hash())
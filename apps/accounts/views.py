@@ -71,8 +71,12 @@ class ProfileView(LoginRequiredMixin, DetailView):
     context_object_name = 'profile'
 
     def get_object(self):
-        profile, created = UserProfile.objects.get_or_create(user=self.request.user)
-        return profile
+        # Usually preloaded with the cached user (see apps.accounts.backends)
+        try:
+            return self.request.user.profile
+        except UserProfile.DoesNotExist:
+            profile, created = UserProfile.objects.get_or_create(user=self.request.user)
+            return profile
 
 
 class ProfileEditView(LoginRequiredMixin, UpdateView):
@@ -1,6 +1,9 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Post, Comment, Reaction, Newsletter
+from django.db.models import Count, Q
+from .models import Category, Post, Comment, Reaction, Newsletter, NewsletterIssue
+from .counters import set_comments_approval
+from .page_cache import invalidate_posts
 
 
 @admin.register(Category)
@@ -29,7 +32,7 @@ class PostAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'category', 'status', 'published_at', 'views_count', 'featured']
     list_filter = ['status', 'category', 'featured', 'created_at', 'published_at']
     search_fields = ['title', 'content', 'excerpt']
-    readonly_fields = ['views_count', 'created_at', 'updated_at']
+    readonly_fields = ['views_count', 'comment_count', 'reaction_count', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Basic Information', {
@@ -42,7 +45,7 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('status', 'is_visible', 'featured', 'published_at', 'scheduled_publish_at')
         }),
         ('Metadata', {
-            'fields': ('views_count', 'created_at', 'updated_at'),
+            'fields': ('views_count', 'comment_count', 'reaction_count', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -73,13 +76,15 @@ class CommentAdmin(admin.ModelAdmin):
     
     def approve_comments(self, request, queryset):
         """Approve selected comments"""
-        updated = queryset.update(is_approved=True)
+        updated = set_comments_approval(queryset, approved=True)
+        invalidate_posts(queryset.values_list('post_id', flat=True))
         self.message_user(request, f'{updated} comment(s) approved.')
     approve_comments.short_description = 'Approve selected comments'
     
     def disapprove_comments(self, request, queryset):
         """Disapprove selected comments"""
-        updated = queryset.update(is_approved=False)
+        updated = set_comments_approval(queryset, approved=False)
+        invalidate_posts(queryset.values_list('post_id', flat=True))
         self.message_user(request, f'{updated} comment(s) disapproved.')
     disapprove_comments.short_description = 'Disapprove selected comments'
 
@@ -120,3 +125,20 @@ class NewsletterAdmin(admin.ModelAdmin):
         updated = queryset.update(is_active=False)
         self.message_user(request, f'{updated} subscriber(s) deactivated.')
     deactivate_subscribers.short_description = 'Deactivate selected subscribers'
+
+
+@admin.register(NewsletterIssue)
+class NewsletterIssueAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'created_at', 'sent_at', 'delivered']
+    readonly_fields = ['created_at', 'sent_at']
+    search_fields = ['subject']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            delivered_count=Count('deliveries', filter=Q(deliveries__sent_at__isnull=False))
+        )
+
+    def delivered(self, obj):
+        """Recipients confirmed sent; use the send_newsletter command to dispatch"""
+        return obj.delivered_count
+    delivered.admin_order_field = 'delivered_count'
@@ -0,0 +1,117 @@
+"""
+Read-only JSON API for posts, categories and comments.
+
+Every list is cursor-paginated, every relation the serializers touch is
+joined up front, and `?fields=` narrows both the payload and, for posts,
+the columns read: post lists skip `content` unless it is asked for.
+`check_api_queries` holds each endpoint to a fixed query budget.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+
+from .models import Category, Comment, Post
+from .serializers import CategorySerializer, CommentSerializer, PostSerializer
+
+# Post fields that are not plain columns of the post row
+POST_RELATIONS = {'author', 'category'}
+POST_COMPUTED = {'url', 'featured_image', 'image_variants'}
+POST_LIST_FIELDS = [name for name in PostSerializer.Meta.fields if name != 'content']
+
+
+class PostCursorPagination(CursorPagination):
+    ordering = ('-published_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CommentCursorPagination(PostCursorPagination):
+    ordering = ('-id',)
+
+
+class CategoryCursorPagination(PostCursorPagination):
+    ordering = ('name',)
+
+
+class CachedReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """Let browsers and shared caches keep anonymous responses for API_CACHE_MAX_AGE seconds"""
+    read_from_replica = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and response.status_code == 200:
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+            patch_vary_headers(response, ['Accept', 'Cookie', 'Authorization'])
+        return response
+
+
+class PostViewSet(CachedReadOnlyViewSet):
+    """Published posts, newest first. /posts/<slug>/comments/ lists approved comments."""
+    serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+    lookup_field = 'slug'
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('default_fields', POST_LIST_FIELDS)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = Post.objects.filter(status='published', is_visible=True)
+        category = self.request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category__slug=category)
+
+        default = POST_LIST_FIELDS if self.action == 'list' else None
+        wanted = PostSerializer.requested_fields(self.request, default)
+        if wanted is None:
+            return queryset.select_related('author', 'category')
+        relations = sorted(POST_RELATIONS & wanted)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        # Read only the requested columns, plus what the ordering, URLs and images need
+        columns = (wanted - POST_RELATIONS - POST_COMPUTED) & {field.name for field in Post._meta.concrete_fields}
+        columns |= {'id', 'slug', 'published_at', 'featured_image', 'featured_image_variants'}
+        columns |= {f'{relation}__{name}' for relation, names in (
+            ('author', ('username', 'first_name', 'last_name')),
+            ('category', ('name', 'slug', 'color')),
+        ) if relation in relations for name in names}
+        return queryset.only(*columns)
+
+    @action(detail=True, pagination_class=CommentCursorPagination, serializer_class=CommentSerializer)
+    def comments(self, request, slug=None):
+        post = get_object_or_404(Post.objects.filter(status='published', is_visible=True).only('id'), slug=slug)
+        comments = Comment.objects.filter(post=post, is_approved=True).select_related('author')
+        page = self.paginate_queryset(comments)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class CategoryViewSet(CachedReadOnlyViewSet):
+    """Categories with their published post counts"""
+    serializer_class = CategorySerializer
+    pagination_class = CategoryCursorPagination
+    lookup_field = 'slug'
+
+    def get_queryset(self):
+        return Category.objects.annotate(
+            post_count=Count('posts', filter=Q(posts__status='published', posts__is_visible=True))
+        )
+
+
+class CommentViewSet(CachedReadOnlyViewSet):
+    """Approved comments on published posts, newest first"""
+    serializer_class = CommentSerializer
+    pagination_class = CommentCursorPagination
+
+    def get_queryset(self):
+        return Comment.objects.filter(
+            is_approved=True, post__status='published', post__is_visible=True
+        ).select_related('author')
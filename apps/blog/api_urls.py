@@ -0,0 +1,12 @@
+from rest_framework.routers import DefaultRouter
+
+from . import api
+
+app_name = 'api'
+
+router = DefaultRouter()
+router.register('posts', api.PostViewSet, basename='post')
+router.register('categories', api.CategoryViewSet, basename='category')
+router.register('comments', api.CommentViewSet, basename='comment')
+
+urlpatterns = router.urls
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BlogConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.blog'
+    verbose_name = 'Blog'
+
+    def ready(self):
+        import apps.blog.signals
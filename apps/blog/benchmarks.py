@@ -0,0 +1,223 @@
+"""
+Per-view latency and query benchmarks.
+
+Every named URL in the blog and accounts apps has a Case describing how to
+request it against the current database (ideally one filled by
+generate_data). `run()` times each case over a number of iterations and
+records its query count and latency percentiles. Requests that write are
+rolled back, so the dataset is the same for every iteration and run.
+Results can be saved as a JSON baseline and later runs compared against
+it: more queries than the baseline, or a p95 that grew past the tolerance,
+is a regression.
+"""
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import get_resolver, reverse
+
+from .models import Category, Comment, Post, Reaction
+from . import datagen, instrumentation
+
+NAMESPACES = ('blog', 'accounts')
+
+
+@dataclass
+class Case:
+    url_name: str
+    method: str = 'get'
+    auth: str = None  # None, 'user' or 'staff'
+    kwargs: object = None  # callable(samples) -> URL kwargs
+    query: object = None  # callable(samples) -> query dict
+    data: object = None  # callable(samples) -> form data, or None to skip the case
+    json: object = None  # callable(samples) -> JSON body
+    label: str = ''
+    iterations: int = None  # cap for expensive cases
+    relogin: bool = False  # the request ends the session
+
+    @property
+    def key(self):
+        return self.label or (self.url_name if self.method == 'get' else f'{self.url_name} ({self.method.upper()})')
+
+    @property
+    def writes(self):
+        return self.method != 'get' or self.relogin
+
+
+CASES = [
+    Case('blog:post-list'),
+    Case('blog:post-detail', kwargs=lambda s: {'slug': s['post'].slug}),
+    Case('blog:category-posts', kwargs=lambda s: {'slug': s['category'].slug}),
+    Case('blog:search-posts', query=lambda s: {'q': s['search']}),
+    Case('blog:comment-threads', kwargs=lambda s: {'post_id': s['post'].pk}),
+    Case('blog:comment-replies', kwargs=lambda s: {'post_id': s['post'].pk, 'thread_id': s['thread_id']}),
+    Case('blog:add-reaction', method='post', auth='user',
+         json=lambda s: {'post_id': s['post'].pk, 'reaction_type': 'love'}),
+    Case('blog:add-comment', method='post', auth='user',
+         data=lambda s: {'post_id': s['post'].pk, 'content': 'Benchmark comment'}),
+    Case('blog:newsletter-subscribe', method='post', json=lambda s: {'email': 'benchmark@example.com'}),
+    Case('blog:admin-dashboard', auth='staff'),
+    Case('blog:admin-post-list', auth='staff'),
+    Case('blog:admin-performance', auth='staff'),
+    Case('blog:admin-export', auth='staff', kwargs=lambda s: {'kind': 'comments'},
+         query=lambda s: {'format': 'ndjson'}, iterations=3),
+    Case('blog:admin-post-create', auth='staff'),
+    Case('blog:admin-post-edit', auth='staff', kwargs=lambda s: {'pk': s['post'].pk}),
+    Case('blog:admin-post-delete', auth='staff', kwargs=lambda s: {'pk': s['post'].pk}),
+    Case('accounts:register'),
+    Case('accounts:login'),
+    Case('accounts:login', method='post', data=lambda s: s['login']),
+    Case('accounts:logout', auth='user', relogin=True),
+    Case('accounts:profile', auth='user'),
+    Case('accounts:profile-edit', auth='user'),
+]
+
+
+def url_names():
+    """Every named URL in the benchmarked namespaces"""
+    resolver = get_resolver()
+    names = set()
+    for namespace in NAMESPACES:
+        _, sub_resolver = resolver.namespace_dict[namespace]
+        names.update(f'{namespace}:{name}' for name in sub_resolver.reverse_dict if isinstance(name, str))
+    return names
+
+
+def uncovered():
+    return sorted(url_names() - {case.url_name for case in CASES})
+
+
+def samples():
+    """The objects the cases request: the busiest post, category and thread of the dataset"""
+    post = Post.objects.filter(status='published', is_visible=True).order_by('-comment_count', '-id').only('id', 'slug').first()
+    if post is None:
+        return None
+    category = (Category.objects.annotate(total=Count('posts')).order_by('-total').only('id', 'slug').first())
+    thread_id = (
+        Comment.objects.filter(post=post, depth=1).values_list('thread_id', flat=True).first()
+        or Comment.objects.filter(post=post, depth=0).values_list('id', flat=True).first()
+        or 0
+    )
+    staff = User.objects.filter(username=datagen.STAFF_USERNAME).first() or User.objects.filter(is_staff=True, is_active=True).first()
+    # A reader without a reaction on the post, so the reaction case inserts one
+    user = (
+        User.objects.filter(is_staff=False, is_active=True, profile__isnull=False)
+        .exclude(pk__in=Reaction.objects.filter(post=post).values('user')).first()
+        or staff
+    )
+    word = Post.objects.filter(pk=post.pk).values_list('title', flat=True)[0].split()[-1]
+    return {
+        'post': post,
+        'category': category,
+        'thread_id': thread_id,
+        'search': word,
+        'staff': staff,
+        'user': user,
+        # Password login can only be measured for the generated staff account, whose password is known
+        'login': {'username': staff.username, 'password': datagen.PASSWORD} if staff and staff.username == datagen.STAFF_USERNAME else None,
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def _request(client, case, url, objects):
+    body = {}
+    if case.json is not None:
+        body = {'data': json.dumps(case.json(objects)), 'content_type': 'application/json'}
+    elif case.data is not None:
+        body = {'data': case.data(objects)}
+    response = getattr(client, case.method)(url, **body)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def run_case(case, objects, iterations, warmup):
+    """Time one case; returns a result dict, or None when the dataset cannot support it"""
+    if case.data is not None and case.data(objects) is None:
+        return None
+    user = objects.get(case.auth) if case.auth else None
+    if case.auth and user is None:
+        return None
+    url = reverse(case.url_name, kwargs=case.kwargs(objects) if case.kwargs else None)
+    if case.query:
+        url += '?' + '&'.join(f'{name}={value}' for name, value in case.query(objects).items())
+
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    iterations = min(iterations, case.iterations or iterations)
+    timings, queries, statuses = [], [], set()
+    for iteration in range(warmup + iterations):
+        if case.relogin and iteration:
+            client.force_login(user)
+        recorder = instrumentation.QueryRecorder()
+        with transaction.atomic():
+            started = time.perf_counter()
+            with instrumentation.record_queries(recorder):
+                response = _request(client, case, url, objects)
+            elapsed = time.perf_counter() - started
+            if case.writes:
+                transaction.set_rollback(True)
+        statuses.add(response.status_code)
+        if iteration >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(recorder.count)
+    return {
+        'url': url,
+        'status': sorted(statuses),
+        'queries': max(queries),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'max_ms': round(max(timings), 2),
+        'iterations': iterations,
+    }
+
+
+def dataset():
+    return {
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'reactions': Reaction.objects.count(),
+        'users': User.objects.count(),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """[(key, problem)] for every case that regressed against the baseline"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result['queries'] > base['queries']:
+            regressions.append((key, f"queries {base['queries']} -> {result['queries']}"))
+        grown = result['p95_ms'] - base['p95_ms']
+        if grown > min_delta_ms and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append((key, f"p95 {base['p95_ms']:.1f}ms -> {result['p95_ms']:.1f}ms"))
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'dataset': dataset(), 'results': results}, f, indent=2, sort_keys=True)
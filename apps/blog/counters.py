@@ -0,0 +1,171 @@
+"""
+Denormalized comment and reaction counters stored on Post, plus the
+per-post reaction histogram in ReactionTally.
+
+Single-row changes are tracked by the signal handlers in apps.blog.signals.
+Bulk operations that bypass signals (queryset.update) must go through the
+helpers here. `reconcile_counters` repairs any drift.
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post, Reaction, ReactionTally
+
+UPDATE_BATCH_SIZE = 500
+
+
+def adjust_post_counters(post_id, comments=0, reactions=0):
+    """Atomically add the given deltas to a post's stored counters"""
+    changes = {}
+    if comments:
+        changes['comment_count'] = F('comment_count') + comments
+    if reactions:
+        changes['reaction_count'] = F('reaction_count') + reactions
+    if changes:
+        Post.objects.filter(pk=post_id).update(**changes)
+
+
+def adjust_reaction_tally(post_id, reaction_type, delta):
+    """Add delta to one bucket of a post's reaction histogram"""
+    tally = ReactionTally.objects.filter(post_id=post_id, reaction_type=reaction_type)
+    if tally.update(count=F('count') + delta) or delta <= 0:
+        # A missing bucket is never created by a decrement: its post may be mid-delete
+        return
+    try:
+        with transaction.atomic():
+            ReactionTally.objects.create(post_id=post_id, reaction_type=reaction_type, count=delta)
+    except IntegrityError:
+        # Created concurrently (or the post is gone); retry the increment
+        tally.update(count=F('count') + delta)
+
+
+def reaction_histogram(post_id):
+    """Return [{'reaction_type': ..., 'count': ...}] for every reaction in use on a post"""
+    return [
+        {'reaction_type': reaction_type, 'count': count}
+        for reaction_type, count in ReactionTally.objects.filter(post_id=post_id, count__gt=0)
+        .order_by('reaction_type').values_list('reaction_type', 'count')
+    ]
+
+
+def set_reaction(post_id, user, reaction_type):
+    """
+    Create or switch a user's reaction, then move the histogram and counters
+    by the change the write itself made: a failed insert or a switch that
+    matched no row counts nothing, so two concurrent first reactions from one
+    user are counted once. Returns the new histogram.
+    Raises IntegrityError if the post does not exist.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                # bulk_create bypasses the Reaction signal handlers; counters are adjusted below
+                Reaction.objects.bulk_create([Reaction(post_id=post_id, user=user, reaction_type=reaction_type)])
+        except IntegrityError:
+            reaction = Reaction.objects.select_for_update().filter(post_id=post_id, user=user).order_by()
+            previous = reaction.values_list('reaction_type', flat=True).first()
+            if previous is None:
+                # Not a duplicate reaction, so the post is missing
+                raise
+            # Conditional on the type just read, so only one of two concurrent switches moves the tallies
+            if previous != reaction_type and reaction.filter(reaction_type=previous).update(reaction_type=reaction_type):
+                adjust_reaction_tally(post_id, previous, -1)
+                adjust_reaction_tally(post_id, reaction_type, 1)
+        else:
+            adjust_post_counters(post_id, reactions=1)
+            adjust_reaction_tally(post_id, reaction_type, 1)
+        return reaction_histogram(post_id)
+
+
+def _apply_comment_deltas(deltas):
+    """Apply {post_id: delta} with one UPDATE per distinct delta"""
+    by_delta = defaultdict(list)
+    for post_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(post_id)
+    for delta, post_ids in by_delta.items():
+        for start in range(0, len(post_ids), UPDATE_BATCH_SIZE):
+            Post.objects.filter(
+                pk__in=post_ids[start:start + UPDATE_BATCH_SIZE]
+            ).update(comment_count=F('comment_count') + delta)
+
+
+def set_comments_approval(queryset, approved):
+    """
+    Bulk approve or disapprove comments, keeping post counters in step.
+    Returns the number of comments whose state actually changed.
+    """
+    with transaction.atomic():
+        changing = queryset.filter(is_approved=not approved)
+        per_post = changing.order_by().values('post').annotate(total=Count('id'))
+        sign = 1 if approved else -1
+        deltas = {row['post']: sign * row['total'] for row in per_post}
+        updated = changing.update(is_approved=approved)
+        _apply_comment_deltas(deltas)
+    return updated
+
+
+def _actual_counts():
+    approved_comments = (
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        .order_by().values('post').annotate(total=Count('id')).values('total')
+    )
+    reactions = (
+        Reaction.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('id')).values('total')
+    )
+    return Post.objects.annotate(
+        actual_comments=Coalesce(Subquery(approved_comments, output_field=IntegerField()), Value(0)),
+        actual_reactions=Coalesce(Subquery(reactions, output_field=IntegerField()), Value(0)),
+    )
+
+
+def reconcile(dry_run=False):
+    """Recount every post and repair stored counters that drifted. Returns the drifted posts."""
+    drifted = list(
+        _actual_counts()
+        .filter(~Q(comment_count=F('actual_comments')) | ~Q(reaction_count=F('actual_reactions')))
+        .only('id', 'comment_count', 'reaction_count')
+        .order_by('id')
+    )
+    if drifted and not dry_run:
+        repaired = [
+            Post(pk=post.pk, comment_count=post.actual_comments, reaction_count=post.actual_reactions)
+            for post in drifted
+        ]
+        with transaction.atomic():
+            Post.objects.bulk_update(repaired, ['comment_count', 'reaction_count'], batch_size=UPDATE_BATCH_SIZE)
+    return drifted
+
+
+def reconcile_reaction_tallies(dry_run=False):
+    """Rebuild histogram rows that disagree with the reactions table. Returns the number repaired."""
+    actual = {
+        (row['post'], row['reaction_type']): row['total']
+        for row in Reaction.objects.order_by().values('post', 'reaction_type').annotate(total=Count('id'))
+    }
+    stored = {
+        (row['post'], row['reaction_type']): row['count']
+        for row in ReactionTally.objects.values('post', 'reaction_type', 'count')
+    }
+    drifted = {
+        key: actual.get(key, 0)
+        for key in actual.keys() | stored.keys()
+        if actual.get(key, 0) != stored.get(key, 0)
+    }
+    if drifted and not dry_run:
+        with transaction.atomic():
+            ReactionTally.objects.bulk_create(
+                [
+                    ReactionTally(post_id=post_id, reaction_type=reaction_type, count=count)
+                    for (post_id, reaction_type), count in drifted.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['post', 'reaction_type'],
+                update_fields=['count'],
+                batch_size=UPDATE_BATCH_SIZE,
+            )
+    return len(drifted)
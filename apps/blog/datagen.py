@@ -0,0 +1,261 @@
+"""
+Synthetic dataset generator for benchmarks.
+
+Builds users, categories, posts, threaded comments and reactions at a
+configurable scale with bulk inserts, one transaction per batch of posts.
+Popularity follows a heavy-tailed distribution, so a few posts collect most
+of the comments, reactions and views, as on a real site. Everything is
+derived from a seed, so the same arguments rebuild the same data.
+
+Post and comment ids are assigned up front, so comment paths, threads and
+the stored counters (comment_count, reaction_count, reaction histograms)
+are written in the same insert instead of being patched afterwards.
+Generated rows are marked with the `bench` prefix (usernames `bench_*`,
+category slugs `bench-*`), and clear() removes them again.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.accounts.models import UserProfile
+from .models import Category, Comment, Post, Reaction, ReactionTally, RelatedPost, SearchTerm
+from . import homepage, page_cache, search
+
+BENCH_PREFIX = 'bench'
+PASSWORD = 'benchmark'
+STAFF_USERNAME = f'{BENCH_PREFIX}_staff'
+INSERT_BATCH_SIZE = 2000
+
+TOPICS = [
+    'Technology', 'Travel', 'Food', 'Business', 'Lifestyle', 'Science', 'Health', 'Design',
+    'Photography', 'Music', 'Books', 'Sports', 'Finance', 'Gardening', 'Parenting', 'History',
+]
+COMMON_WORDS = (
+    'the of and to in is it that for you was with on as have be at this from by not but what all '
+    'were when we there can an your which their said if do will each about how up out them then she '
+    'many some so these would other into has more her two like him see time could no make than first '
+    'been its who now people my made over did down only way find use may water long little very after '
+    'words called just where most know get through back much before go good new write our used me man '
+    'too any day same right look think also around another came come work three word must because does '
+    'part even place well such here take why things help put years different away again off went old '
+    'number great tell men say small every found still between name should home big give air line set '
+    'own under read last never us left end along while might next sound below saw something thought '
+    'both few those always looked show large often together asked house world going want school important'
+).split()
+TOPIC_WORDS = (
+    'python django database query index cache latency server browser design pattern garden recipe '
+    'flavour journey mountain island camera lens album guitar novel chapter market budget invest '
+    'startup product customer habit sleep running training history empire museum science research '
+    'planet climate energy ocean forest coffee bread spice wine team season match player chart trend '
+    'painting colour layout typography photo portrait family child school learning teacher story'
+).split()
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk inserts keep the generated created_at/updated_at instead of auto_now values"""
+    fields = [field for model in models for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Generator:
+    def __init__(self, seed=0, days=730, progress=None):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.progress = progress or (lambda *args: None)
+        self.now = timezone.now()
+        # Zipf-like word frequencies: common words dominate, topic words give posts something to match on
+        self.words = COMMON_WORDS + TOPIC_WORDS
+        self.word_weights = [1 / (rank + 1) for rank in range(len(COMMON_WORDS))] + [0.02] * len(TOPIC_WORDS)
+
+    def _text(self, low, high):
+        words = self.rng.choices(self.words, self.word_weights, k=self.rng.randint(low, high))
+        sentences, start = [], 0
+        while start < len(words):
+            end = start + self.rng.randint(6, 18)
+            sentence = ' '.join(words[start:end])
+            sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+            start = end
+        paragraphs = [' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        return '\n\n'.join(paragraphs)
+
+    def _title(self):
+        words = self.rng.choices(self.words, self.word_weights, k=self.rng.randint(3, 8))
+        words += self.rng.sample(TOPIC_WORDS, 2)
+        self.rng.shuffle(words)
+        return ' '.join(words).capitalize()
+
+    def _popularity(self, count, total):
+        """Split `total` over `count` items with a heavy tail, using stochastic rounding"""
+        weights = [self.rng.paretovariate(1.3) for _ in range(count)]
+        scale = total / sum(weights) if weights else 0
+        shares = []
+        for weight in weights:
+            share = weight * scale
+            whole = int(share)
+            shares.append(whole + (1 if self.rng.random() < share - whole else 0))
+        return shares
+
+    def _spread(self, flags, total):
+        """Like _popularity, but only items whose flag is set get a share"""
+        shares = iter(self._popularity(sum(flags), total))
+        return [next(shares) if flag else 0 for flag in flags]
+
+    def create_users(self, count):
+        """Create bench users (plus the bench_staff account) and their profiles; returns the user ids"""
+        password = make_password(PASSWORD)
+        existing = set(User.objects.filter(username__startswith=f'{BENCH_PREFIX}_').values_list('username', flat=True))
+        names = [f'{BENCH_PREFIX}_{index:07d}' for index in range(count)] + [STAFF_USERNAME]
+        joined = self.now - timedelta(days=self.days)
+        users = [
+            User(username=name, email=f'{name}@example.com', password=password, date_joined=joined,
+                 first_name=name.title().replace('_', ' '), is_staff=name == STAFF_USERNAME)
+            for name in names if name not in existing
+        ]
+        with transaction.atomic():
+            created = User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+            UserProfile.objects.bulk_create([UserProfile(user=user) for user in created], batch_size=INSERT_BATCH_SIZE)
+        self.progress('users', len(created), len(names))
+        return list(User.objects.filter(username__in=names[:-1]).values_list('id', flat=True))
+
+    def create_categories(self, count):
+        names = [TOPICS[index % len(TOPICS)] + (f' {index // len(TOPICS) + 1}' if index >= len(TOPICS) else '')
+                 for index in range(count)]
+        categories = [
+            Category(name=f'{name} (bench)', slug=f'{BENCH_PREFIX}-{slugify(name)}',
+                     description=f'Generated {name.lower()} posts', color='#%06x' % self.rng.randrange(0xffffff))
+            for name in names
+        ]
+        Category.objects.bulk_create(categories, ignore_conflicts=True)
+        self.progress('categories', count, count)
+        return list(Category.objects.filter(slug__in=[category.slug for category in categories]).values_list('id', flat=True))
+
+    def _comments_for(self, post, count, user_ids, next_id):
+        comments = []
+        start = post.published_at or post.created_at
+        span = max((self.now - start).total_seconds(), 60)
+        offsets = sorted(self.rng.random() * span for _ in range(count))
+        for offset in offsets:
+            created = start + timedelta(seconds=offset)
+            comment = Comment(
+                id=next_id, post_id=post.pk, author_id=self.rng.choice(user_ids),
+                content=self._text(5, 60), created_at=created, updated_at=created,
+                is_approved=self.rng.random() < 0.95,
+            )
+            segment = str(next_id).zfill(Comment.PATH_SEGMENT_WIDTH)
+            parent = self.rng.choice(comments) if comments and self.rng.random() < 0.3 else None
+            if parent is not None and parent.depth < 3:
+                comment.parent_id, comment.thread_id = parent.pk, parent.thread_id
+                comment.depth, comment.path = parent.depth + 1, f'{parent.path}/{segment}'
+            else:
+                comment.thread_id, comment.depth, comment.path = next_id, 0, segment
+            comments.append(comment)
+            next_id += 1
+        return comments, next_id
+
+    def _reactions_for(self, post, count, user_ids):
+        types = [choice for choice, _ in Reaction.REACTION_CHOICES]
+        start = post.published_at or post.created_at
+        span = max((self.now - start).total_seconds(), 60)
+        return [
+            Reaction(post_id=post.pk, user_id=user_id, created_at=start + timedelta(seconds=self.rng.random() * span),
+                     reaction_type=self.rng.choices(types, (50, 20, 15, 10, 5))[0])
+            for user_id in self.rng.sample(user_ids, min(count, len(user_ids)))
+        ]
+
+    def create_posts(self, count, comments, reactions, user_ids, category_ids, batch_size, index=True):
+        """Create `count` posts with about `comments` comments and `reactions` reactions spread over them"""
+        published_flags = [self.rng.random() < 0.92 for _ in range(count)]
+        comment_counts = self._spread(published_flags, comments)
+        reaction_counts = self._spread(published_flags, reactions)
+        author_weights = self._popularity(len(user_ids), len(user_ids) * 10)
+        next_post = (Post.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+        next_comment = (Comment.objects.aggregate(top=Max('id'))['top'] or 0) + 1
+        totals = {'posts': 0, 'comments': 0, 'reactions': 0}
+
+        for batch_start in range(0, count, batch_size):
+            posts, batch_comments, batch_reactions, tallies = [], [], [], []
+            for offset in range(batch_start, min(batch_start + batch_size, count)):
+                created = self.now - timedelta(seconds=self.rng.random() * self.days * 86400)
+                published = published_flags[offset]
+                title = self._title()
+                post = Post(
+                    id=next_post, title=title, slug=f'{slugify(title)[:80]}-{next_post}',
+                    content=self._text(150, 900), excerpt=self._text(15, 40)[:480],
+                    author_id=self.rng.choices(user_ids, author_weights)[0],
+                    category_id=self.rng.choice(category_ids) if category_ids else None,
+                    status='published' if published else 'draft',
+                    published_at=created + timedelta(hours=self.rng.random() * 48) if published else None,
+                    created_at=created, updated_at=created,
+                    featured=published and self.rng.random() < 0.01,
+                    views_count=(comment_counts[offset] + reaction_counts[offset]) * self.rng.randint(5, 40),
+                )
+                post.update_reading_stats()
+                next_post += 1
+                if published:
+                    post_comments, next_comment = self._comments_for(post, comment_counts[offset], user_ids, next_comment)
+                    post_reactions = self._reactions_for(post, reaction_counts[offset], user_ids)
+                    post.comment_count = sum(1 for comment in post_comments if comment.is_approved)
+                    post.reaction_count = len(post_reactions)
+                    histogram = {}
+                    for reaction in post_reactions:
+                        histogram[reaction.reaction_type] = histogram.get(reaction.reaction_type, 0) + 1
+                    tallies.extend(ReactionTally(post_id=post.pk, reaction_type=kind, count=n) for kind, n in histogram.items())
+                    batch_comments.extend(post_comments)
+                    batch_reactions.extend(post_reactions)
+                posts.append(post)
+
+            with transaction.atomic(), _explicit_timestamps(Post, Comment, Reaction):
+                Post.objects.bulk_create(posts, batch_size=INSERT_BATCH_SIZE)
+                Comment.objects.bulk_create(batch_comments, batch_size=INSERT_BATCH_SIZE)
+                Reaction.objects.bulk_create(batch_reactions, batch_size=INSERT_BATCH_SIZE)
+                ReactionTally.objects.bulk_create(tallies, batch_size=INSERT_BATCH_SIZE)
+                if index:
+                    search.index_new_posts(posts, batch_size=INSERT_BATCH_SIZE * 5)
+            totals['posts'] += len(posts)
+            totals['comments'] += len(batch_comments)
+            totals['reactions'] += len(batch_reactions)
+            self.progress('posts', totals['posts'], count, totals)
+
+        # Explicit ids leave sequences behind on databases that keep them separately (e.g. PostgreSQL)
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Post, Comment]):
+                cursor.execute(sql)
+        page_cache.bump(page_cache.SITE_SCOPE)
+        homepage.invalidate()
+        return totals
+
+
+def clear():
+    """Delete every generated row; returns the number of rows deleted"""
+    posts = Post.objects.filter(author__username__startswith=f'{BENCH_PREFIX}_')
+    deleted = 0
+    with transaction.atomic():
+        # Raw deletes skip the per-row counter signals, whose targets go away too
+        for model, lookup in (
+            (Comment, 'post__in'), (Reaction, 'post__in'), (ReactionTally, 'post__in'),
+            (SearchTerm, 'post__in'), (RelatedPost, 'post__in'), (RelatedPost, 'related__in'),
+        ):
+            deleted += model.objects.filter(**{lookup: posts})._raw_delete(connection.alias)
+        deleted += posts._raw_delete(connection.alias)
+        deleted += User.objects.filter(username__startswith=f'{BENCH_PREFIX}_').delete()[0]
+        deleted += Category.objects.filter(slug__startswith=f'{BENCH_PREFIX}-').delete()[0]
+    page_cache.bump(page_cache.SITE_SCOPE)
+    homepage.invalidate()
+    return deleted
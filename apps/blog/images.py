@@ -0,0 +1,150 @@
+"""
+Resized image derivatives for uploaded images.
+
+When a post's featured image or a profile avatar changes, the upload is
+resized to a set of widths in WebP and JPEG and the files are written next
+to the original (photo.jpg -> photo.w800.webp, photo.w800.jpg). Resizing
+runs in a process pool after the transaction commits, so requests never
+wait on Pillow; when a job finishes, the variant map is stored on the row
+with a queryset update, guarded on the image being unchanged meanwhile.
+The update bypasses post_save, so a stored map sends variants_stored and
+the apps drop the cached pages and users that embed the old map.
+
+The variant map is a JSON field shaped like
+    {'source': 'posts/.../photo.jpg', 'webp': [[320, name], ...], 'jpeg': [...]}
+and templates turn it into srcset attributes with the `srcset` filter and
+`responsive_image` tag in blog_images.
+
+This module imports no models: pool workers are spawned fresh and only
+need render_variants() and Pillow.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = (
+    ('webp', 'WEBP', '.webp'),
+    ('jpeg', 'JPEG', '.jpg'),
+)
+
+# Sent with sender=model and pk after a variant map is stored
+variants_stored = Signal()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def variant_name(name, width, extension):
+    root, _ = os.path.splitext(name)
+    return f'{root}.w{width}{extension}'
+
+
+def render_variants(media_root, name, widths, quality):
+    """
+    Write the derivatives of one image and return its variant map.
+    Runs in a worker process: plain paths in, plain data out.
+    """
+    variants = {'source': name}
+    with Image.open(os.path.join(media_root, name)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            # JPEG has no alpha channel; flatten onto white
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert('RGBA').getchannel('A'))
+            image = background
+        # Never upscale; an image narrower than every width gets one variant at its own size
+        targets = sorted({width for width in widths if width < image.width} or {image.width})
+        for key, pil_format, extension in FORMATS:
+            variants[key] = []
+            for width in targets:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                target = variant_name(name, width, extension)
+                resized.save(os.path.join(media_root, target), pil_format, quality=quality, optimize=True)
+                variants[key].append([width, target])
+    return variants
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: forking a threaded web worker can deadlock
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _job_args(name, widths):
+    return default_storage.path(''), name, list(widths), settings.IMAGE_VARIANT_QUALITY
+
+
+def store_variants(model, pk, field_name, variants_field, variants):
+    """Save a variant map unless the image was replaced while it was being rendered"""
+    updated = model._default_manager.filter(pk=pk, **{field_name: variants['source']}).update(
+        **{variants_field: variants}
+    )
+    if updated:
+        variants_stored.send(sender=model, pk=pk)
+    return updated
+
+
+def schedule(instance, field_name, variants_field, widths):
+    """Render derivatives for instance.<field_name> in the pool once the current transaction commits"""
+    name = getattr(instance, field_name).name
+    if not name:
+        return
+    model, pk = type(instance), instance.pk
+
+    def done(future):
+        try:
+            variants = future.result()
+        except Exception:
+            logger.exception('Could not render image variants for %s', name)
+            return
+        store_variants(model, pk, field_name, variants_field, variants)
+
+    def submit():
+        _get_pool().submit(render_variants, *_job_args(name, widths)).add_done_callback(done)
+
+    transaction.on_commit(submit)
+
+
+def backfill(queryset, field_name, variants_field, widths, force=False):
+    """
+    Render derivatives for every row of queryset with an image, in the pool.
+    Yields (pk, variants or None) as jobs finish.
+    """
+    rows = queryset.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+    if not force:
+        rows = rows.filter(**{variants_field: {}})
+    pool = _get_pool()
+    jobs = {}
+    for pk, name in rows.order_by('pk').values_list('pk', field_name).iterator():
+        if not default_storage.exists(name):
+            logger.warning('Skipping missing image %s', name)
+            yield pk, None
+            continue
+        jobs[pool.submit(render_variants, *_job_args(name, widths))] = pk
+    for future in as_completed(jobs):
+        pk = jobs[future]
+        try:
+            variants = future.result()
+        except Exception:
+            logger.exception('Could not render image variants for %s', pk)
+            yield pk, None
+            continue
+        store_variants(queryset.model, pk, field_name, variants_field, variants)
+        yield pk, variants
@@ -0,0 +1,257 @@
+"""
+Bulk post import from JSON Lines, CSV or WordPress WXR exports.
+
+Input is read as a stream of records and handled in batches. For each batch,
+authors and categories are looked up with one query apiece (and cached for
+later batches), slugs are de-duplicated in memory against the existing
+slugs that could collide, and the posts are inserted with bulk_create along
+with their search index entries, all in one transaction. After every batch
+the number of records consumed is written to a checkpoint file, so an
+interrupted import resumes where it stopped.
+
+bulk_create bypasses Post.save() and the post signals, so the derived
+fields (slug, published_at, reading stats) are filled in here and caches
+are invalidated once at the end.
+"""
+import csv
+import json
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.text import slugify
+
+from .models import Category, Post
+from . import homepage, page_cache, search
+
+FORMATS = ('jsonl', 'csv', 'wxr')
+SLUG_MAX_LENGTH = Post._meta.get_field('slug').max_length
+# Leave room for a "-<n>" suffix when a slug collides
+SLUG_BASE_LENGTH = SLUG_MAX_LENGTH - 8
+# Bases per suffix lookup; SQLite caps expression depth at 1000
+SLUG_PREFIX_CHUNK = 200
+
+WXR_NAMESPACES = {
+    'content': 'http://purl.org/rss/1.0/modules/content/',
+    'excerpt': 'http://wordpress.org/export/1.2/excerpt/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'wp': 'http://wordpress.org/export/1.2/',
+}
+WXR_STATUSES = {'publish': 'published', 'future': 'draft', 'draft': 'draft', 'pending': 'draft', 'private': 'draft'}
+
+
+class PostImportError(Exception):
+    pass
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl', '.csv': 'csv', '.xml': 'wxr', '.wxr': 'wxr'}.get(extension)
+
+
+def read_jsonl(stream):
+    """One JSON object per line, e.g. the output of `export_data posts`"""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise PostImportError(f'Line {number}: {e}')
+
+
+def read_csv(stream):
+    """CSV with a header row naming the record fields"""
+    # Post bodies easily exceed the csv module's 128 KB default field limit
+    csv.field_size_limit(sys.maxsize)
+    yield from csv.DictReader(stream)
+
+
+def read_wxr(stream):
+    """WordPress eXtended RSS; only <item>s of post type `post` are imported"""
+    wp = WXR_NAMESPACES['wp']
+    for _, element in ElementTree.iterparse(stream, events=('end',)):
+        if element.tag != 'item':
+            continue
+        if element.findtext('wp:post_type', 'post', WXR_NAMESPACES) == 'post':
+            category = element.find("category[@domain='category']")
+            published = element.findtext('wp:post_date_gmt', '', WXR_NAMESPACES)
+            yield {
+                'title': element.findtext('title', ''),
+                'slug': element.findtext('wp:post_name', '', WXR_NAMESPACES),
+                'content': element.findtext('content:encoded', '', WXR_NAMESPACES),
+                'excerpt': element.findtext('excerpt:encoded', '', WXR_NAMESPACES),
+                'author': element.findtext('dc:creator', '', WXR_NAMESPACES),
+                'category': category.get('nicename') or category.text if category is not None else '',
+                'status': WXR_STATUSES.get(element.findtext(f'{{{wp}}}status', 'draft'), 'draft'),
+                'published_at': published.replace(' ', 'T') + '+00:00' if published and not published.startswith('0000') else '',
+            }
+        # Drop the parsed item so memory stays flat on large exports
+        element.clear()
+
+
+READERS = {'jsonl': read_jsonl, 'csv': read_csv, 'wxr': read_wxr}
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)['records']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, records):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump({'records': records, 'updated_at': timezone.now().isoformat()}, f)
+    os.replace(temporary, path)
+
+
+def _flag(value, default=False):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _datetime(value):
+    if not value:
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class PostImporter:
+    """Insert post records batch by batch; see the module docstring"""
+
+    def __init__(self, default_author=None, skip_existing=False):
+        self.default_author = default_author
+        self.skip_existing = skip_existing
+        self.authors = {}
+        self.categories = {}
+        self.touched_categories = set()
+
+    def _resolve_authors(self, names):
+        missing = names - self.authors.keys()
+        if missing:
+            for user in User.objects.filter(username__in=missing):
+                self.authors[user.username] = user
+            for name in missing - self.authors.keys():
+                self.authors[name] = self.default_author
+
+    def _resolve_categories(self, keys):
+        missing = keys - self.categories.keys()
+        if not missing:
+            return
+        slugs = {key: slugify(key)[:200] for key in missing}
+        for category in Category.objects.filter(Q(slug__in=slugs.values()) | Q(name__in=missing)):
+            self.categories[category.slug] = category
+            self.categories[category.name] = category
+        new = {slugs[key]: key for key in missing - self.categories.keys() if slugs[key]}
+        if new:
+            Category.objects.bulk_create(
+                [Category(name=name, slug=slug) for slug, name in new.items()],
+                ignore_conflicts=True,
+            )
+            for category in Category.objects.filter(slug__in=new):
+                self.categories[category.slug] = category
+                self.categories[new[category.slug]] = category
+        for key in missing - self.categories.keys():
+            self.categories[key] = None
+
+    def _taken_slugs(self, bases):
+        """Existing slugs equal to, or suffixed variants of, any of the bases"""
+        taken = set(Post.objects.filter(slug__in=bases).values_list('slug', flat=True))
+        existing = sorted(taken)
+        for start in range(0, len(existing), SLUG_PREFIX_CHUNK):
+            suffixed = reduce(or_, (Q(slug__startswith=f'{base}-') for base in existing[start:start + SLUG_PREFIX_CHUNK]))
+            taken.update(Post.objects.filter(suffixed).values_list('slug', flat=True))
+        return taken
+
+    def build_batch(self, records):
+        """Return (posts, skipped) for a list of records"""
+        self._resolve_authors({str(record.get('author') or '') for record in records})
+        self._resolve_categories({str(record.get('category') or '') for record in records} - {''})
+
+        bases = []
+        for record in records:
+            base = slugify(record.get('slug') or record.get('title') or '')[:SLUG_BASE_LENGTH].strip('-')
+            bases.append(base or 'post')
+        taken = self._taken_slugs(set(bases))
+
+        posts, skipped = [], 0
+        now = timezone.now()
+        for record, base in zip(records, bases):
+            author = self.authors.get(str(record.get('author') or ''))
+            title = (record.get('title') or '').strip()
+            if author is None or not title:
+                skipped += 1
+                continue
+            if base in taken and self.skip_existing and record.get('slug'):
+                skipped += 1
+                continue
+            slug, suffix = base, 2
+            while slug in taken:
+                slug, suffix = f'{base}-{suffix}', suffix + 1
+            taken.add(slug)
+
+            status = record.get('status') if record.get('status') in ('draft', 'published') else 'draft'
+            published_at = _datetime(record.get('published_at'))
+            if status == 'published' and published_at is None:
+                published_at = now
+            category = self.categories.get(str(record.get('category') or ''))
+            post = Post(
+                title=title[:500],
+                slug=slug,
+                content=record.get('content') or '',
+                excerpt=(record.get('excerpt') or '')[:500],
+                author=author,
+                category=category,
+                status=status,
+                is_visible=_flag(record.get('is_visible'), True),
+                featured=_flag(record.get('featured')),
+                published_at=published_at,
+                scheduled_publish_at=_datetime(record.get('scheduled_publish_at')),
+                views_count=int(record.get('views_count') or 0),
+            )
+            post.update_reading_stats()
+            posts.append(post)
+            if category is not None:
+                self.touched_categories.add(category.pk)
+        return posts, skipped
+
+    def insert(self, records, batch_size):
+        """Insert one batch of records in a transaction. Returns (inserted, skipped)."""
+        with transaction.atomic():
+            posts, skipped = self.build_batch(records)
+            Post.objects.bulk_create(posts, batch_size=batch_size)
+            search.index_new_posts(posts, batch_size=batch_size * 10)
+        return len(posts), skipped
+
+    def finish(self):
+        """Invalidate the caches the skipped post signals would have"""
+        page_cache.invalidate_categories(self.touched_categories)
+        homepage.invalidate()
+
+
+def batches(records, size, skip=0):
+    """Yield lists of up to `size` records after skipping the first `skip`"""
+    records = islice(records, skip, None)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,218 @@
+"""
+Per-request SQL and latency instrumentation.
+
+RequestMetricsMiddleware samples a fraction of requests
+(REQUEST_METRICS_SAMPLE_RATE). For a sampled request it wraps every
+database connection with an execute wrapper that times each query and
+groups it by fingerprint: the SQL with its placeholder lists collapsed, so
+`post.author` looked up in a loop shows up as one fingerprint executed N
+times. Template rendering is timed separately for TemplateResponses.
+
+Requests that are slow, run too many queries or repeat a fingerprint are
+logged as one JSON record on the `apps.blog.instrumentation` logger. Every
+sampled request is also folded into per-endpoint totals, kept in process
+memory and merged into the cache every few seconds, which the staff
+performance page reads. Unsampled requests cost one random() call.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'reqmetrics'
+ENDPOINTS_KEY = f'{KEY_PREFIX}:endpoints'
+FLUSH_INTERVAL = 5
+TOP_FINGERPRINTS = 5
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """SQL with literals and IN (...) lists normalised, so repeats of one statement compare equal"""
+    sql = _PLACEHOLDER_LIST.sub('(%s, ...)', sql)
+    sql = _LITERAL.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """Execute wrapper that times queries and counts them per fingerprint"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            entry = self.fingerprints.setdefault(fingerprint(sql), [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def repeated(self, threshold):
+        """[(fingerprint, executions, seconds)] for statements run at least `threshold` times, worst first"""
+        return sorted(
+            ((sql, count, duration) for sql, (count, duration) in self.fingerprints.items() if count >= threshold),
+            key=lambda item: item[1], reverse=True,
+        )
+
+
+def is_sampled():
+    rate = settings.REQUEST_METRICS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def record_queries(recorder):
+    """Context manager installing `recorder` on every configured database connection"""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(recorder))
+    return stack
+
+
+class _EndpointTotals:
+    """Per-process accumulator, merged into the shared cache at most every FLUSH_INTERVAL seconds"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def add(self, endpoint, metrics, repeated):
+        with self.lock:
+            totals = self.pending.setdefault(endpoint, _empty_totals())
+            _merge(totals, {
+                'requests': 1,
+                'total_ms': metrics['total_ms'],
+                'sql_ms': metrics['sql_ms'],
+                'render_ms': metrics['render_ms'],
+                'queries': metrics['queries'],
+                'max_ms': metrics['total_ms'],
+                'max_queries': metrics['queries'],
+                'repeated_requests': 1 if repeated else 0,
+                'fingerprints': {sql: count for sql, count, _ in repeated[:TOP_FINGERPRINTS]},
+            })
+            due = time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        # Read-modify-write: concurrent flushes from other processes can drop
+        # a few samples, which is acceptable for sampled diagnostics
+        endpoints = set(cache.get(ENDPOINTS_KEY) or ()) | set(pending)
+        stored = cache.get_many([_endpoint_key(endpoint) for endpoint in pending])
+        for endpoint, totals in pending.items():
+            merged = stored.get(_endpoint_key(endpoint)) or _empty_totals()
+            _merge(merged, totals)
+            stored[_endpoint_key(endpoint)] = merged
+        stored[ENDPOINTS_KEY] = sorted(endpoints)
+        cache.set_many(stored, timeout=None)
+
+
+def _endpoint_key(endpoint):
+    return f'{KEY_PREFIX}:endpoint:{hashlib.md5(endpoint.encode()).hexdigest()}'
+
+
+def _empty_totals():
+    return {
+        'requests': 0, 'total_ms': 0.0, 'sql_ms': 0.0, 'render_ms': 0.0, 'queries': 0,
+        'max_ms': 0.0, 'max_queries': 0, 'repeated_requests': 0, 'fingerprints': {},
+    }
+
+
+def _merge(totals, sample):
+    for name in ('requests', 'total_ms', 'sql_ms', 'render_ms', 'queries', 'repeated_requests'):
+        totals[name] += sample[name]
+    totals['max_ms'] = max(totals['max_ms'], sample['max_ms'])
+    totals['max_queries'] = max(totals['max_queries'], sample['max_queries'])
+    fingerprints = totals['fingerprints']
+    for sql, count in sample['fingerprints'].items():
+        fingerprints[sql] = max(fingerprints.get(sql, 0), count)
+    if len(fingerprints) > TOP_FINGERPRINTS:
+        totals['fingerprints'] = dict(sorted(fingerprints.items(), key=lambda item: item[1], reverse=True)[:TOP_FINGERPRINTS])
+
+
+endpoint_totals = _EndpointTotals()
+
+
+def report(request, response, recorder, total, render):
+    """Log the request if it crossed a threshold and fold it into the endpoint totals"""
+    match = getattr(request, 'resolver_match', None)
+    endpoint = f'{request.method} {match.view_name if match else "<unresolved>"}'
+    repeated = recorder.repeated(settings.REQUEST_METRICS_REPEAT_THRESHOLD)
+    metrics = {
+        'endpoint': endpoint,
+        'path': request.path,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+        'sql_ms': round(recorder.duration * 1000, 2),
+        'render_ms': round(render * 1000, 2),
+        'queries': recorder.count,
+    }
+    endpoint_totals.add(endpoint, metrics, repeated)
+
+    if (metrics['total_ms'] >= settings.REQUEST_METRICS_SLOW_MS
+            or recorder.count >= settings.REQUEST_METRICS_QUERY_LIMIT or repeated):
+        metrics['repeated'] = [
+            {'sql': sql[:500], 'count': count, 'ms': round(duration * 1000, 2)}
+            for sql, count, duration in repeated[:TOP_FINGERPRINTS]
+        ]
+        logger.warning(json.dumps(metrics), extra={'request_metrics': metrics})
+
+
+def worst_endpoints(order='total_ms', limit=50):
+    """Endpoint totals with averages, sorted by the average of `order` (or `requests`)"""
+    endpoint_totals.flush()
+    endpoints = cache.get(ENDPOINTS_KEY) or []
+    stored = cache.get_many([_endpoint_key(endpoint) for endpoint in endpoints])
+    rows = []
+    for endpoint in endpoints:
+        totals = stored.get(_endpoint_key(endpoint))
+        if not totals or not totals['requests']:
+            continue
+        requests = totals['requests']
+        rows.append({
+            'endpoint': endpoint,
+            'requests': requests,
+            'avg_ms': totals['total_ms'] / requests,
+            'avg_sql_ms': totals['sql_ms'] / requests,
+            'avg_render_ms': totals['render_ms'] / requests,
+            'avg_queries': totals['queries'] / requests,
+            'max_ms': totals['max_ms'],
+            'max_queries': totals['max_queries'],
+            'repeated_requests': totals['repeated_requests'],
+            'fingerprints': sorted(totals['fingerprints'].items(), key=lambda item: item[1], reverse=True),
+        })
+    key = {'total_ms': 'avg_ms', 'sql_ms': 'avg_sql_ms', 'queries': 'avg_queries'}.get(order, order)
+    if rows and key not in rows[0]:
+        key = 'avg_ms'
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return rows[:limit]
+
+
+def reset():
+    endpoint_totals.flush()
+    endpoints = cache.get(ENDPOINTS_KEY) or []
+    cache.delete_many([_endpoint_key(endpoint) for endpoint in endpoints] + [ENDPOINTS_KEY])
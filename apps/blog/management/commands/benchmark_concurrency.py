@@ -0,0 +1,159 @@
+import asyncio
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from apps.blog.benchmarks import percentile
+from apps.blog.models import Post
+
+SERVERS = {
+    'gunicorn': {
+        'module': 'gunicorn',
+        'command': lambda workers, port: [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--timeout', '120', '--log-level', 'warning',
+        ],
+    },
+    'uvicorn': {
+        'module': 'uvicorn',
+        'command': lambda workers, port: [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+            '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+            '--no-access-log', '--log-level', 'warning',
+        ],
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ('Start gunicorn (sync workers, config.wsgi) and uvicorn (config.asgi) with the same number of '
+            'processes and compare throughput, latency and failed requests as concurrent connections grow, '
+            'optionally with slow clients holding connections open')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=sorted(SERVERS), action='append', help='Only run the given server(s)')
+        parser.add_argument('--workers', type=int, default=4, help='Processes per server')
+        parser.add_argument('--concurrency', default='10,50,200', help='Comma-separated connection counts')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per concurrency level')
+        parser.add_argument('--slow-clients', type=int, default=0,
+                            help='Extra connections that send their request headers one byte per second')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+        parser.add_argument('--path', action='append', help='Path to request (default: the post list and a post)')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        paths = options['path'] or self.default_paths()
+        levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        self.stdout.write(f"Paths: {', '.join(paths)}; {options['workers']} workers per server")
+
+        for name in options['server'] or sorted(SERVERS):
+            server = SERVERS[name]
+            if importlib.util.find_spec(server['module']) is None:
+                self.stderr.write(self.style.WARNING(f"{name} is not installed (pip install {server['module']}); skipped"))
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            process = subprocess.Popen(server['command'](options['workers'], options['port']), cwd=settings.BASE_DIR,
+                                       env={**os.environ, 'PYTHONUNBUFFERED': '1'})
+            try:
+                self.wait_until_ready(process, options['port'], paths[0])
+                for level in levels:
+                    result = asyncio.run(self.load(options['port'], paths, level, options))
+                    self.report(level, result, options['duration'])
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    def default_paths(self):
+        slug = Post.objects.filter(status='published', is_visible=True).values_list('slug', flat=True).first()
+        if slug is None:
+            raise CommandError('No published posts to request; run generate_data first')
+        return [reverse('blog:post-list'), reverse('blog:post-detail', kwargs={'slug': slug})]
+
+    def wait_until_ready(self, process, port, path, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'The server exited with status {process.returncode}')
+            try:
+                status, _ = asyncio.run(request('127.0.0.1', port, path, 5))
+                if status:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise CommandError('The server did not start in time')
+
+    async def load(self, port, paths, concurrency, options):
+        deadline = time.monotonic() + options['duration']
+        result = {'ms': [], 'statuses': {}, 'errors': 0}
+
+        async def client(index):
+            while time.monotonic() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.perf_counter()
+                try:
+                    status, _ = await request('127.0.0.1', port, path, options['timeout'])
+                except (OSError, asyncio.TimeoutError):
+                    result['errors'] += 1
+                    continue
+                result['ms'].append((time.perf_counter() - started) * 1000)
+                result['statuses'][status] = result['statuses'].get(status, 0) + 1
+
+        slow = [asyncio.create_task(slow_client('127.0.0.1', port, deadline)) for _ in range(options['slow_clients'])]
+        await asyncio.sleep(0.1 if slow else 0)
+        await asyncio.gather(*(client(index) for index in range(concurrency)))
+        for task in slow:
+            task.cancel()
+        await asyncio.gather(*slow, return_exceptions=True)
+        return result
+
+    def report(self, concurrency, result, duration):
+        latencies = result['ms']
+        failed = result['errors'] + sum(count for status, count in result['statuses'].items() if status >= 500)
+        line = f'  {concurrency:5d} connections: {len(latencies) / duration:8.0f} req/s'
+        if latencies:
+            line += (f'  p50 {percentile(latencies, 0.5):8.1f} ms  p95 {percentile(latencies, 0.95):8.1f} ms'
+                     f'  max {max(latencies):8.1f} ms')
+        style = self.style.ERROR if failed else self.style.SUCCESS
+        self.stdout.write(line + style(f'  failed {failed}'))
+
+
+async def request(host, port, path, timeout):
+    """One GET on a fresh connection; returns (status, body size)"""
+    async def exchange():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode())
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        status_line = response.split(b'\r\n', 1)[0].split()
+        return (int(status_line[1]) if len(status_line) > 1 else 0), len(response)
+
+    return await asyncio.wait_for(exchange(), timeout)
+
+
+async def slow_client(host, port, deadline):
+    """Hold a connection by sending a request one header byte per second"""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    try:
+        writer.write(f'GET / HTTP/1.1\r\nHost: {host}\r\nX-Padding: '.encode())
+        while time.monotonic() < deadline:
+            await asyncio.sleep(1)
+            writer.write(b'a')
+            await writer.drain()
+    except OSError:
+        pass
+    finally:
+        writer.close()
@@ -0,0 +1,143 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from apps.blog.benchmarks import percentile
+from apps.blog.models import Post
+
+MODES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'OPTIONS': {},
+        'journal_mode': 'DELETE',
+    },
+    'tuned': {
+        'ENGINE': 'config.backends.sqlite3',
+        'OPTIONS': settings.SQLITE_TUNED_OPTIONS,
+        'journal_mode': 'WAL',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = ('Run concurrent readers and writers against copies of the database with the stock and the tuned '
+            'SQLite configuration, and compare read latency, throughput and "database is locked" errors')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode')
+        parser.add_argument('--mode', choices=sorted(MODES), action='append',
+                            help='Only run the given mode(s)')
+
+    def handle(self, *args, **options):
+        source = connections['default'].settings_dict
+        if source['ENGINE'] not in (mode['ENGINE'] for mode in MODES.values()):
+            raise CommandError('The default database is not SQLite')
+        post_ids = list(Post.objects.filter(status='published').values_list('id', flat=True)[:1000])
+        if not post_ids:
+            raise CommandError('No published posts to work with; run generate_data first')
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['mode'] or ['default', 'tuned']:
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.copy_database(source['NAME'], path, MODES[name]['journal_mode'])
+                alias = f'benchmark_{name}'
+                connections.settings[alias] = {
+                    **source, 'NAME': path, 'ENGINE': MODES[name]['ENGINE'],
+                    'OPTIONS': MODES[name]['OPTIONS'], 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+                }
+                try:
+                    result = self.run_mode(alias, post_ids, options)
+                finally:
+                    del connections.settings[alias]
+                self.report(name, result, options['duration'])
+
+    def copy_database(self, source, destination, journal_mode):
+        """Snapshot the live database with the backup API, then set the journal mode to test"""
+        with sqlite3.connect(source) as origin, sqlite3.connect(destination) as copy:
+            origin.backup(copy)
+            copy.execute(f'PRAGMA journal_mode = {journal_mode}')
+        origin.close()
+        copy.close()
+
+    def run_mode(self, alias, post_ids, options):
+        deadline = time.monotonic() + options['duration']
+        lock = threading.Lock()
+        result = {'read_ms': [], 'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+
+        def reader():
+            rng = random.Random()
+            latencies, reads, errors = [], 0, 0
+            try:
+                while time.monotonic() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        list(Post.objects.using(alias).filter(status='published')
+                             .order_by('-published_at').values_list('id', 'title', 'views_count')[:20])
+                        Post.objects.using(alias).filter(pk=rng.choice(post_ids)).values_list('views_count', flat=True).first()
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    reads += 1
+            finally:
+                connections[alias].close()
+            with lock:
+                result['read_ms'].extend(latencies)
+                result['reads'] += reads
+                result['read_errors'] += errors
+
+        def writer():
+            rng = random.Random()
+            writes, errors = 0, 0
+            try:
+                while time.monotonic() < deadline:
+                    post_id = rng.choice(post_ids)
+                    try:
+                        # Read-then-write, like the counter and reaction code paths
+                        with transaction.atomic(using=alias):
+                            Post.objects.using(alias).filter(pk=post_id).values_list('views_count', flat=True).first()
+                            Post.objects.using(alias).filter(pk=post_id).update(views_count=F('views_count') + 1)
+                    except OperationalError:
+                        errors += 1
+                        continue
+                    writes += 1
+            finally:
+                connections[alias].close()
+            with lock:
+                result['writes'] += writes
+                result['write_errors'] += errors
+
+        threads = ([threading.Thread(target=reader) for _ in range(options['readers'])]
+                   + [threading.Thread(target=writer) for _ in range(options['writers'])])
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+    def report(self, name, result, duration):
+        latencies = result['read_ms']
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{name} ({MODES[name]["ENGINE"]})'))
+        if latencies:
+            self.stdout.write(
+                f"  reads:  {result['reads'] / duration:8.0f}/s  p50 {percentile(latencies, 0.5):.2f} ms  "
+                f"p95 {percentile(latencies, 0.95):.2f} ms  max {max(latencies):.2f} ms"
+            )
+        else:
+            self.stdout.write('  reads:  none completed')
+        self.stdout.write(f"  writes: {result['writes'] / duration:8.0f}/s")
+        errors = result['read_errors'] + result['write_errors']
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f"  'database is locked' errors: {result['read_errors']} on reads, {result['write_errors']} on writes"
+        ))
@@ -0,0 +1,83 @@
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from apps.blog import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Time every blog and accounts view against the current data and compare with a saved baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', help='Only run cases whose name contains this text')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'var' / 'benchmarks' / 'baseline.json'),
+                            help='Baseline file to compare against (and to write with --save-baseline)')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write these results as the new baseline instead of comparing')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 growth before a case counts as a regression')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Ignore p95 growth smaller than this, which is timer noise')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Leave the anonymous page cache on (it is disabled to time the views themselves)')
+
+    def handle(self, *args, **options):
+        missing = benchmarks.uncovered()
+        if missing and not options['only']:
+            raise CommandError(f"No benchmark case for: {', '.join(missing)} (add them to apps.blog.benchmarks.CASES)")
+
+        objects = benchmarks.samples()
+        if objects is None:
+            raise CommandError('No published posts to benchmark; run generate_data first')
+
+        baseline = None if options['save_baseline'] else benchmarks.load_baseline(options['baseline'])
+        results, skipped = {}, []
+        self.stdout.write(f"{'case':<40} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  status")
+        with tempfile.TemporaryDirectory() as view_log, override_settings(
+            ALLOWED_HOSTS=['*'],
+            PAGE_CACHE_ENABLED=options['page_cache'] and settings.PAGE_CACHE_ENABLED,
+            REQUEST_METRICS_ENABLED=False,
+            VIEW_COUNT_LOG_DIR=view_log,
+        ):
+            for case in benchmarks.CASES:
+                if options['only'] and options['only'] not in case.key:
+                    continue
+                result = benchmarks.run_case(case, objects, max(options['iterations'], 1), max(options['warmup'], 0))
+                if result is None:
+                    skipped.append(case.key)
+                    continue
+                results[case.key] = result
+                line = (f"{case.key:<40} {result['queries']:>7} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                        f"{result['p99_ms']:>8.1f}  {','.join(map(str, result['status']))}")
+                base = (baseline or {}).get('results', {}).get(case.key)
+                if base:
+                    line += f"  (baseline {base['queries']} q, p95 {base['p95_ms']:.1f} ms)"
+                self.stdout.write(line)
+
+        for key in skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {key}: the dataset has no suitable user or object'))
+        errors = [key for key, result in results.items() if any(status >= 500 for status in result['status'])]
+        if errors:
+            raise CommandError(f"Server errors in: {', '.join(errors)}")
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline for {len(results)} case(s) to {options['baseline']}"))
+            return
+        if baseline is None:
+            self.stdout.write('No baseline to compare against; rerun with --save-baseline to create one')
+            return
+        if baseline.get('dataset') != benchmarks.dataset():
+            self.stdout.write(self.style.WARNING(
+                f"Dataset differs from the baseline's ({baseline.get('dataset')}); timings may not be comparable"
+            ))
+        regressions = benchmarks.compare(results, baseline.get('results', {}), options['tolerance'], options['min_delta_ms'])
+        for key, problem in regressions:
+            self.stdout.write(self.style.ERROR(f'REGRESSION {key}: {problem}'))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,67 @@
+from contextlib import ExitStack, contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.blog.models import Post
+
+
+def endpoints(slug=None):
+    """(url, query budget) for every API endpoint; the per-post ones need a published post's slug"""
+    yield '/api/v1/posts/', 1
+    yield '/api/v1/posts/?fields=id,title,slug', 1
+    yield '/api/v1/posts/?fields=title,content,author,category', 1
+    yield '/api/v1/posts/?page_size=100', 1
+    yield '/api/v1/categories/', 1
+    yield '/api/v1/comments/', 1
+    if slug is not None:
+        yield f'/api/v1/posts/{slug}/', 1
+        yield f'/api/v1/posts/{slug}/comments/', 2
+
+
+@contextmanager
+def capture_queries():
+    """Capture queries on every database alias; API views read from the replica when one is configured"""
+    with ExitStack() as stack:
+        yield [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+
+
+def check_endpoint(client, url, budget):
+    """Request url and return (queries used, list of problems)"""
+    with capture_queries() as contexts:
+        response = client.get(url)
+    queries = [query for context in contexts for query in context.captured_queries]
+    problems = []
+    if response.status_code != 200:
+        problems.append(f'status {response.status_code}')
+    if len(queries) > budget:
+        problems.append(f'{len(queries)} queries, budget {budget}')
+    if url.startswith('/api/v1/posts/?') or url == '/api/v1/posts/':
+        wants_content = 'content' in url
+        reads_content = any('"content"' in query['sql'] for query in queries)
+        if reads_content != wants_content:
+            problems.append('content column read' if reads_content else 'content column missing')
+    return len(queries), problems
+
+
+class Command(BaseCommand):
+    help = 'Request every API endpoint against the current database and fail if any exceeds its query budget'
+
+    def handle(self, *args, **options):
+        slug = (
+            Post.objects.filter(status='published', is_visible=True).order_by('-published_at')
+            .values_list('slug', flat=True).first()
+        )
+        client = Client()
+        failures = []
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for url, budget in endpoints(slug):
+                used, problems = check_endpoint(client, url, budget)
+                status = self.style.ERROR('FAIL ' + ', '.join(problems)) if problems else self.style.SUCCESS('ok')
+                self.stdout.write(f'{url:<60} {used} queries  {status}')
+                if problems:
+                    failures.append(url)
+        if failures:
+            raise CommandError(f'{len(failures)} endpoint(s) over budget or incorrect')
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.blog.view_counter import drain
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered post view counts to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and drain every --interval seconds')
+        parser.add_argument('--interval', type=float, default=settings.VIEW_COUNT_FLUSH_INTERVAL,
+                            help='Seconds between drains when running with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            views, posts = drain()
+            if views or not options['loop']:
+                self.stdout.write(f'Applied {views} view(s) across {posts} post(s)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.blog import export
+
+
+class Command(BaseCommand):
+    help = 'Stream posts, comments or reactions to a file or stdout as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(export.EXPORTS))
+        parser.add_argument('--format', choices=export.FORMATS, default='ndjson')
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        blocks = export.stream(options['kind'], options['format'])
+        if not options['output']:
+            for block in blocks:
+                sys.stdout.write(block)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for block in blocks:
+                output.write(block)
+        self.stderr.write(f'Wrote {options["kind"]} to {options["output"]}')
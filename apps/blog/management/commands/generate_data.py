@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.blog import datagen, stats
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of users, categories, posts, comments and reactions for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=100000,
+                            help='Approximate total; spread over published posts by popularity')
+        parser.add_argument('--reactions', type=int, default=500000,
+                            help='Approximate total; at most one per user and post')
+        parser.add_argument('--days', type=int, default=730,
+                            help='Spread post dates over this many past days')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Posts (with their comments and reactions) per transaction')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip building search index entries for the generated posts')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete previously generated data first; with --posts 0, only delete')
+
+    def progress(self, kind, done, total, totals=None):
+        elapsed = time.monotonic() - self.started
+        line = f'  {kind}: {done}/{total}'
+        if totals:
+            rows = sum(totals.values())
+            line += f" ({totals['comments']} comments, {totals['reactions']} reactions, {rows / elapsed:.0f} rows/s)"
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            started = time.monotonic()
+            deleted = datagen.clear()
+            self.stdout.write(f'Deleted {deleted} generated row(s) in {time.monotonic() - started:.1f}s')
+            if not options['posts']:
+                return
+
+        self.started = time.monotonic()
+        generator = datagen.Generator(seed=options['seed'], days=options['days'], progress=self.progress)
+        user_ids = generator.create_users(max(options['users'], 1))
+        category_ids = generator.create_categories(options['categories'])
+        totals = generator.create_posts(
+            options['posts'], options['comments'], options['reactions'], user_ids, category_ids,
+            batch_size=max(options['batch_size'], 1), index=not options['no_index'],
+        )
+        stats.rollup(full=True)
+        elapsed = time.monotonic() - self.started
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['posts']} posts, {totals['comments']} comments and {totals['reactions']} reactions "
+            f'in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)'
+        ))
+        self.stdout.write(f'Log in as {datagen.STAFF_USERNAME} / {datagen.PASSWORD} to browse it. '
+                          'Run rebuild_related_posts for related-post suggestions.')
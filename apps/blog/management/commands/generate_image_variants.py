@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import UserProfile
+from apps.blog import images
+from apps.blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Render resized WebP/JPEG derivatives for existing featured images and avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render images that already have derivatives')
+
+    def handle(self, *args, **options):
+        targets = [
+            ('featured images', Post.objects.all(), 'featured_image', 'featured_image_variants', settings.POST_IMAGE_WIDTHS),
+            ('avatars', UserProfile.objects.all(), 'avatar', 'avatar_variants', settings.AVATAR_WIDTHS),
+        ]
+        for label, queryset, field_name, variants_field, widths in targets:
+            rendered = failed = 0
+            for pk, variants in images.backfill(queryset, field_name, variants_field, widths, force=options['force']):
+                if variants is None:
+                    failed += 1
+                else:
+                    rendered += 1
+            self.stdout.write(f'Rendered derivatives for {rendered} {label} ({failed} skipped or failed)')
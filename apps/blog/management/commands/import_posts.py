@@ -0,0 +1,75 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blog import importer
+
+
+class Command(BaseCommand):
+    help = 'Bulk import posts from a JSON Lines, CSV or WordPress WXR file, resuming from a checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=importer.FORMATS,
+                            help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Records per transaction and bulk insert')
+        parser.add_argument('--author',
+                            help='Username to attribute posts to when their author does not exist')
+        parser.add_argument('--checkpoint',
+                            help='Checkpoint file (default: <path>.checkpoint)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore an existing checkpoint and start from the first record')
+        parser.add_argument('--skip-existing', action='store_true',
+                            help='Skip records whose slug is already taken instead of renaming them')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or importer.detect_format(path)
+        if input_format is None:
+            raise CommandError('Cannot tell the input format from the file name; pass --format')
+
+        default_author = None
+        if options['author']:
+            default_author = User.objects.filter(username=options['author']).first()
+            if default_author is None:
+                raise CommandError(f'User "{options["author"]}" does not exist')
+
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        done = 0 if options['restart'] else importer.read_checkpoint(checkpoint)
+        if done:
+            self.stdout.write(f'Resuming after {done} record(s) from {checkpoint}')
+
+        post_importer = importer.PostImporter(default_author, skip_existing=options['skip_existing'])
+        inserted = skipped = 0
+        started = time.monotonic()
+        mode = 'rb' if input_format == 'wxr' else 'r'
+        encoding = None if mode == 'rb' else 'utf-8'
+        try:
+            with open(path, mode, encoding=encoding, newline=None if mode == 'rb' else '') as stream:
+                records = importer.READERS[input_format](stream)
+                for batch in importer.batches(records, options['batch_size'], skip=done):
+                    batch_started = time.monotonic()
+                    batch_inserted, batch_skipped = post_importer.insert(batch, options['batch_size'])
+                    done += len(batch)
+                    importer.write_checkpoint(checkpoint, done)
+                    inserted += batch_inserted
+                    skipped += batch_skipped
+                    elapsed = time.monotonic() - batch_started
+                    self.stdout.write(
+                        f'  {done} record(s) read, {inserted} inserted, {skipped} skipped '
+                        f'({batch_inserted / elapsed if elapsed else 0:.0f} posts/s)'
+                    )
+        except importer.PostImportError as e:
+            raise CommandError(f'{e} (resume with the same command; {done} record(s) are done)')
+        finally:
+            post_importer.finish()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {inserted} post(s) in {elapsed:.2f}s ({inserted / elapsed if elapsed else 0:.0f} posts/s); '
+            f'{skipped} skipped'
+        ))
+        if inserted:
+            self.stdout.write('Run rebuild_related_posts to link the new posts to related content')
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.blog.scheduler import next_due, publish_due
+
+
+class Command(BaseCommand):
+    help = 'Publish drafts whose scheduled publish time has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, sleeping until the next post is due')
+        parser.add_argument('--max-sleep', type=float, default=60,
+                            help='Longest sleep in seconds, so newly scheduled posts are noticed')
+
+    def handle(self, *args, **options):
+        while True:
+            for post in publish_due():
+                self.stdout.write(f'Published "{post.title}"')
+            if not options['loop']:
+                break
+
+            now = timezone.now()
+            due = next_due(now)
+            sleep = options['max_sleep']
+            if due is not None:
+                sleep = min(sleep, max((due - now).total_seconds(), 0))
+            time.sleep(sleep)
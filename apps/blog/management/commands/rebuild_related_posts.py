@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.blog.related import rebuild, refresh_stale
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-posts similarity index for all published posts, or only for stale ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of post ids to fetch per query')
+        parser.add_argument('--stale', action='store_true',
+                            help='Only refresh posts whose neighbours changed since they were computed')
+        parser.add_argument('--loop', action='store_true',
+                            help='With --stale, keep running and refresh every --interval seconds')
+        parser.add_argument('--interval', type=float, default=60,
+                            help='Seconds between refreshes when running with --loop')
+
+    def handle(self, *args, **options):
+        if not options['stale']:
+            started = time.monotonic()
+            processed = rebuild(batch_size=options['batch_size'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'Computed related posts for {processed} post(s) in {elapsed:.2f}s'
+            ))
+            return
+
+        while True:
+            processed = refresh_stale(batch_size=options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(f'Refreshed related posts for {processed} stale post(s)')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
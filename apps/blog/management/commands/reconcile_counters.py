@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.counters import reconcile, reconcile_reaction_tallies
+
+
+class Command(BaseCommand):
+    help = 'Recount comments and reactions and repair drifted Post counters and reaction histograms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted posts without fixing them')
+
+    def handle(self, *args, **options):
+        drifted = reconcile(dry_run=options['dry_run'])
+        for post in drifted:
+            self.stdout.write(
+                f'Post {post.pk}: comments {post.comment_count} -> {post.actual_comments}, '
+                f'reactions {post.reaction_count} -> {post.actual_reactions}'
+            )
+        tallies = reconcile_reaction_tallies(dry_run=options['dry_run'])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {len(drifted)} drifted post(s) and {tallies} reaction histogram bucket(s)'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.blog import stats
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily statistics rollups shown on the admin dashboard'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2,
+                            help='Trailing days to re-aggregate (today and yesterday by default)')
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild the event rollups for all of history')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and refresh every --interval seconds')
+        parser.add_argument('--interval', type=float, default=settings.STATS_ROLLUP_INTERVAL,
+                            help='Seconds between refreshes when running with --loop')
+
+    def handle(self, *args, **options):
+        full = options['full']
+        while True:
+            started = time.monotonic()
+            rows = stats.rollup(days=max(options['days'], 1), full=full)
+            self.stdout.write(f'Wrote {rows} rollup row(s) in {time.monotonic() - started:.2f}s')
+            if not options['loop']:
+                break
+            # Only the first pass of a --full --loop run rebuilds everything
+            full = False
+            time.sleep(options['interval'])
@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blog import newsletter
+from apps.blog.models import NewsletterIssue
+
+
+class Command(BaseCommand):
+    help = 'Send a newsletter issue to every active subscriber, resuming where a previous run stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument('issue_id', type=int)
+        parser.add_argument('--batch-size', type=int, default=settings.NEWSLETTER_BATCH_SIZE,
+                            help='Recipients per batch (one SMTP connection each)')
+        parser.add_argument('--workers', type=int, default=settings.NEWSLETTER_WORKERS,
+                            help='Batches sent in parallel')
+        parser.add_argument('--retry-unconfirmed', action='store_true',
+                            help='Resend to recipients a crashed run claimed but never confirmed')
+
+    def handle(self, *args, **options):
+        try:
+            issue = NewsletterIssue.objects.get(pk=options['issue_id'])
+        except NewsletterIssue.DoesNotExist:
+            raise CommandError(f'Newsletter issue {options["issue_id"]} does not exist')
+
+        unconfirmed = newsletter.unconfirmed(issue)
+        if options['retry_unconfirmed']:
+            released, _ = unconfirmed.delete()
+            if released:
+                self.stdout.write(f'Released {released} unconfirmed recipient(s) for resending')
+        elif unconfirmed.exists():
+            self.stdout.write(self.style.WARNING(
+                f'Skipping {unconfirmed.count()} recipient(s) claimed by an interrupted run; '
+                'use --retry-unconfirmed to resend to them'
+            ))
+
+        def progress(sent, failed, elapsed):
+            self.stdout.write(f'  {sent} sent, {failed} failed, {sent / elapsed if elapsed else 0:.1f} msg/s')
+
+        result = newsletter.dispatch(issue, options['batch_size'], options['workers'], progress=progress)
+        rate = result['sent'] / result['elapsed'] if result['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent "{issue}" to {result["sent"]} subscriber(s) in {result["elapsed"]:.2f}s '
+            f'({rate:.1f} msg/s); {result["failed"]} failed'
+        ))
@@ -0,0 +1,36 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from config import routers
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database onto the replica with the online backup API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and copy every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds between copies when running with --loop')
+
+    def handle(self, *args, **options):
+        if routers.REPLICA not in settings.DATABASES:
+            raise CommandError('No replica configured; set DATABASE_REPLICA_PATH')
+        primary = str(settings.DATABASES[routers.PRIMARY]['NAME'])
+        replica = str(settings.DATABASES[routers.REPLICA]['NAME'])
+        while True:
+            started = time.monotonic()
+            source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+            try:
+                # One step, so readers of the replica never see a half-copied database
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+            self.stdout.write(f'Copied {primary} to {replica} in {(time.monotonic() - started) * 1000:.0f} ms')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,148 @@
+import time
+from abc import ABC, abstractmethod
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from config import routers
+from . import instrumentation
+
+
+class AsyncCapableMiddleware(ABC):
+    """
+    Base for middleware that runs natively in both modes. Under ASGI a
+    sync-only middleware makes Django run everything inside it, async views
+    included, in a worker thread; these switch to __acall__ instead.
+    Subclasses implement handle() for sync and __acall__() for async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    @abstractmethod
+    def handle(self, request):
+        """Sync path"""
+
+    @abstractmethod
+    async def __acall__(self, request):
+        """Async path"""
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware, WhiteNoiseMiddleware):
+    """WhiteNoise, which is sync-only, with an async path for ASGI"""
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        AsyncCapableMiddleware.__init__(self, get_response)
+
+    def handle(self, request):
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Looks the file up on disk (DEBUG only)
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RequestMetricsMiddleware(AsyncCapableMiddleware):
+    """Record query counts, SQL time and render time for a sample of requests (see apps.blog.instrumentation)"""
+
+    def sampled(self, request):
+        if not settings.REQUEST_METRICS_ENABLED or not instrumentation.is_sampled():
+            return False
+        request._metrics_render = 0.0
+        return True
+
+    def handle(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+
+        recorder = instrumentation.QueryRecorder()
+        started = time.perf_counter()
+        with instrumentation.record_queries(recorder):
+            response = self.get_response(request)
+        instrumentation.report(request, response, recorder, time.perf_counter() - started, request._metrics_render)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled(request):
+            return await self.get_response(request)
+
+        recorder = instrumentation.QueryRecorder()
+        started = time.perf_counter()
+        # The async ORM runs queries in the request's sync thread, so the
+        # wrappers are installed on that thread's connections
+        recording = await sync_to_async(instrumentation.record_queries)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recording.close)()
+        await sync_to_async(instrumentation.report)(
+            request, response, recorder, time.perf_counter() - started, request._metrics_render
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        if hasattr(request, '_metrics_render'):
+            render_started = time.perf_counter()
+
+            def finished(rendered):
+                request._metrics_render += time.perf_counter() - render_started
+
+            response.add_post_render_callback(finished)
+        return response
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Let views marked `read_from_replica = True` read from the replica on
+    GET/HEAD, and pin clients to the primary for REPLICA_STICKY_SECONDS after
+    they write (see config.routers). Unused when no replica is configured.
+    """
+    cookie_name = 'primary_pin'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if routers.REPLICA not in settings.DATABASES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        # Scope process_view's routing decision to this request
+        with routers.reading_from_replica(False):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with routers.reading_from_replica(False):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    def pin(self, request, response):
+        if request.method not in self.safe_methods and response.status_code < 400:
+            response.set_cookie(self.cookie_name, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Django views expose their class as view_class, DRF views as cls
+        view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+        if (getattr(view_class, 'read_from_replica', False) and request.method in ('GET', 'HEAD')
+                and self.cookie_name not in request.COOKIES):
+            routers.route_reads_to_replica()
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:19
+
+import math
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A frozen copy of apps.blog.search as of this migration, so later tokenizer
+# changes do not change what it produces; rebuild_search_index applies them
+TOKEN_RE = re.compile(r'\w+')
+FIELD_WEIGHTS = {'title': 5.0, 'excerpt': 2.0, 'content': 1.0}
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that
+    the this to was were will with
+""".split())
+MAX_TERM_LENGTH = 64
+BATCH_SIZE = 500
+
+
+def build_terms(title, excerpt, content):
+    scores = {}
+    for field, text in (('title', title), ('excerpt', excerpt), ('content', content)):
+        for token in TOKEN_RE.findall((text or '').lower()):
+            if len(token) > 1 and token not in STOPWORDS:
+                token = token[:MAX_TERM_LENGTH]
+                scores[token] = scores.get(token, 0.0) + FIELD_WEIGHTS[field]
+    return {term: 1.0 + math.log(score) for term, score in scores.items()}
+
+
+def index_existing_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    SearchTerm = apps.get_model('blog', 'SearchTerm')
+    entries = []
+    rows = Post.objects.values_list('id', 'title', 'excerpt', 'content').order_by('id')
+    for indexed, (post_id, title, excerpt, content) in enumerate(rows.iterator(chunk_size=BATCH_SIZE), 1):
+        entries.extend(
+            SearchTerm(post_id=post_id, term=term, weight=weight)
+            for term, weight in build_terms(title, excerpt, content).items()
+        )
+        if indexed % BATCH_SIZE == 0:
+            SearchTerm.objects.bulk_create(entries, batch_size=1000)
+            entries = []
+    SearchTerm.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='blog.post')),
+            ],
+            options={
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(index_existing_posts, migrations.RunPython.noop),
+    ]
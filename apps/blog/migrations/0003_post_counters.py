@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    Reaction = apps.get_model('blog', 'Reaction')
+    approved_comments = (
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        .order_by().values('post').annotate(total=Count('id')).values('total')
+    )
+    reactions = (
+        Reaction.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('id')).values('total')
+    )
+    Post.objects.update(
+        comment_count=Coalesce(Subquery(approved_comments, output_field=IntegerField()), Value(0)),
+        reaction_count=Coalesce(Subquery(reactions, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_searchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.IntegerField(default=0, help_text='Approved comments, maintained by apps.blog.counters'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reaction_count',
+            field=models.IntegerField(default=0, help_text='Reactions, maintained by apps.blog.counters'),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
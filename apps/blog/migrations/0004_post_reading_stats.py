@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+def compute_reading_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    batch = []
+    for post_id, content in Post.objects.values_list('id', 'content').iterator():
+        word_count = len(content.split())
+        batch.append(Post(id=post_id, word_count=word_count, reading_time=max(1, word_count // 200)))
+        if len(batch) >= 500:
+            Post.objects.bulk_update(batch, ['word_count', 'reading_time'])
+            batch = []
+    Post.objects.bulk_update(batch, ['word_count', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Estimated reading time in minutes'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(compute_reading_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def tally_existing(apps, schema_editor):
+    Reaction = apps.get_model('blog', 'Reaction')
+    ReactionTally = apps.get_model('blog', 'ReactionTally')
+    rows = Reaction.objects.order_by().values('post_id', 'reaction_type').annotate(total=Count('id'))
+    ReactionTally.objects.bulk_create(
+        [ReactionTally(post_id=row['post_id'], reaction_type=row['reaction_type'], count=row['total']) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_relatedpost'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReactionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reaction_type', models.CharField(choices=[('like', '👍 Like'), ('love', '❤️ Love'), ('happy', '😄 Happy'), ('wow', '😮 Wow'), ('sad', '😢 Sad')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_tallies', to='blog.post')),
+            ],
+            options={
+                'unique_together': {('post', 'reaction_type')},
+            },
+        ),
+        migrations.RunPython(tally_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copies of Comment.PATH_SEGMENT_WIDTH and Comment.MAX_DEPTH
+PATH_SEGMENT_WIDTH = 10
+MAX_DEPTH = 8
+BATCH_SIZE = 500
+
+
+def walk_threads(Comment, roots):
+    """
+    Fill in thread, path and depth below the given root ids, one level at a
+    time. Like Comment.save(), replies below MAX_DEPTH attach to their
+    parent's parent, so depth and path length stay bounded.
+    """
+    # id -> (thread id, path, depth, parent id, parent path) of the current level
+    level = {}
+    for comment_id in roots:
+        segment = str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+        level[comment_id] = (comment_id, segment, 0, None, '')
+    Comment.objects.bulk_update(
+        [Comment(pk=comment_id, parent_id=None, thread_id=comment_id, path=path, depth=0)
+         for comment_id, (_, path, _, _, _) in level.items()],
+        ['parent', 'thread', 'path', 'depth'], batch_size=BATCH_SIZE,
+    )
+    while level:
+        ids = list(level)
+        next_level = {}
+        for start in range(0, len(ids), BATCH_SIZE):
+            children = Comment.objects.filter(parent__in=ids[start:start + BATCH_SIZE]).values_list('id', 'parent_id')
+            for comment_id, parent_id in children:
+                thread_id, parent_path, parent_depth, grandparent_id, grandparent_path = level[parent_id]
+                if parent_depth >= MAX_DEPTH:
+                    parent_id, parent_path, parent_depth = grandparent_id, grandparent_path, parent_depth - 1
+                segment = str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+                next_level[comment_id] = (thread_id, f'{parent_path}/{segment}', parent_depth + 1, parent_id, parent_path)
+        Comment.objects.bulk_update(
+            [Comment(pk=comment_id, parent_id=parent_id, thread_id=thread_id, path=path, depth=depth)
+             for comment_id, (thread_id, path, depth, parent_id, _) in next_level.items()],
+            ['parent', 'thread', 'path', 'depth'], batch_size=BATCH_SIZE,
+        )
+        level = next_level
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model('blog', 'Comment')
+    walk_threads(Comment, list(Comment.objects.filter(parent__isnull=True).order_by('id').values_list('id', flat=True)))
+    # Whatever the walk did not reach hangs off a cycle or a missing parent;
+    # make its oldest comment a top-level one and walk from there
+    while True:
+        orphan = Comment.objects.filter(path='').order_by('id').values_list('id', flat=True).first()
+        if orphan is None:
+            break
+        walk_threads(Comment, [orphan])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_reactiontally'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=99),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='thread',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', '-id'], name='blog_commen_post_id_685a40_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['thread', 'path'], name='blog_commen_thread__4ae39b_idx'),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
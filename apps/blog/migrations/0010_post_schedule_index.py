@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_newsletter_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', 'scheduled_publish_at'], name='blog_post_status_2f0c91_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_schedule_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='featured_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized copies, maintained by apps.blog.images'),
+        ),
+    ]
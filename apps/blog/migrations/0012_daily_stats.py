@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_featured_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('metric', models.CharField(choices=[('posts_published', 'Posts published'), ('comments', 'Comments'), ('reactions', 'Reactions'), ('views', 'Views'), ('total_posts', 'Total posts'), ('published_posts', 'Published posts'), ('draft_posts', 'Draft posts'), ('total_comments', 'Total comments'), ('total_reactions', 'Total reactions')], max_length=32)),
+                ('dimension', models.CharField(blank=True, help_text='Empty for the overall value, else e.g. "post:12", "category:3" or a reaction type', max_length=64)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['metric', 'dimension', 'date'], name='blog_dailys_metric_5383a3_idx')],
+                'unique_together': {('date', 'metric', 'dimension')},
+            },
+        ),
+    ]
@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.mixins import AccessMixin
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import page_cache
+
+
+class PageCacheMixin:
+    """
+    Serve anonymous GET requests from the page cache.
+
+    Views declare which generation scopes their output depends on via
+    get_page_cache_scopes(); returning None skips the cache for a request.
+    """
+
+    def get_page_cache_scopes(self):
+        return [page_cache.SITE_SCOPE]
+
+    def get_page_cache_meta(self):
+        """Extra data stored with the page and handed to page_cache_hit()"""
+        return {}
+
+    def page_cache_hit(self, meta):
+        """Hook for per-request side effects that must run on cached hits too; sync even in async views"""
+
+    def get_page_cache_key(self, request):
+        """The cache key for this request, or None when it must not be cached"""
+        if not page_cache.is_cacheable(request):
+            return None
+        scopes = self.get_page_cache_scopes()
+        if scopes is None:
+            return None
+        return page_cache.make_key(request, scopes)
+
+    def serve_cached(self, request, key):
+        cached = page_cache.lookup(request, key)
+        if cached is None:
+            return None
+        response, meta = cached
+        self.page_cache_hit(meta)
+        return response
+
+    def store_when_rendered(self, key, response):
+        meta = self.get_page_cache_meta()
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(lambda rendered: page_cache.store(key, rendered, meta))
+        else:
+            page_cache.store(key, response, meta)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.page_cache_adispatch(request, *args, **kwargs)
+        key = self.get_page_cache_key(request)
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+        cached = self.serve_cached(request, key)
+        if cached is not None:
+            return cached
+
+        get_token(request)
+        response = super().dispatch(request, *args, **kwargs)
+        return self.store_when_rendered(key, response)
+
+    async def page_cache_adispatch(self, request, *args, **kwargs):
+        key = await sync_to_async(self.get_page_cache_key)(request)
+        if key is None:
+            return await super().dispatch(request, *args, **kwargs)
+        cached = await sync_to_async(self.serve_cached)(request, key)
+        if cached is not None:
+            return cached
+
+        get_token(request)
+        response = await super().dispatch(request, *args, **kwargs)
+        return await sync_to_async(self.store_when_rendered)(key, response)
+
+
+class ConditionalGetMixin:
+    """
+    Answer anonymous revalidations with 304 Not Modified before any
+    rendering happens.
+
+    get_conditional_validators() returns (etag_parts, last_modified) for a
+    request, or None to skip conditional handling. The default derives them
+    from the page cache generations of get_page_cache_scopes(), so it pairs
+    with PageCacheMixin; list it first so a 304 skips the cache lookup too.
+    """
+
+    def get_conditional_validators(self):
+        scopes = self.get_page_cache_scopes()
+        if scopes is None:
+            return None
+        generations = page_cache.get_generations(scopes)
+        return [f'{scope}={generation}' for scope, generation in zip(scopes, generations)], page_cache.last_changed(scopes)
+
+    def conditional_hit(self):
+        """Hook for per-request side effects that must run on 304 responses too; sync even in async views"""
+
+    def get_conditional_state(self, request):
+        """(etag, last_modified, 304/412 response or None), or None to skip conditional handling"""
+        if not page_cache.is_anonymous_read(request):
+            return None
+        validators = self.get_conditional_validators()
+        if validators is None:
+            return None
+
+        parts, last_modified = validators
+        etag = quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+        if isinstance(last_modified, datetime.datetime):
+            last_modified = last_modified.timestamp()
+        last_modified = int(last_modified) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None and response.status_code == 304:
+            self.conditional_hit()
+        return etag, last_modified, response
+
+    def add_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304) and not response.streaming:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Browsers keep the page but revalidate it on every visit
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.conditional_adispatch(request, *args, **kwargs)
+        state = self.get_conditional_state(request)
+        if state is None:
+            return super().dispatch(request, *args, **kwargs)
+        etag, last_modified, response = state
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    async def conditional_adispatch(self, request, *args, **kwargs):
+        state = await sync_to_async(self.get_conditional_state)(request)
+        if state is None:
+            return await super().dispatch(request, *args, **kwargs)
+        etag, last_modified, response = state
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+
+async def aget_user(request):
+    """request.user, loaded off the event loop (session and user lookups may query)"""
+    def load():
+        request.user.is_authenticated  # evaluates the lazy object
+        return request.user
+    return await sync_to_async(load)()
+
+
+class AsyncLoginRequiredMixin(AccessMixin):
+    """LoginRequiredMixin for views with async handlers"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return self.handle_no_permission()
+        return await super().dispatch(request, *args, **kwargs)
@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.utils.text import slugify
 from django.db.models import Q
 from django.urls import reverse
+from django.utils import timezone
 
 class Category(models.Model):
     name = models.CharField(max_length=200, unique=True)
@@ -25,6 +26,8 @@ class Category(models.Model):
 
 
 class Post(models.Model):
+    WORDS_PER_MINUTE = 200
+
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('published', 'Published'),
@@ -35,6 +38,7 @@ class Post(models.Model):
     content = models.TextField()
     excerpt = models.TextField(max_length=500, help_text='Brief summary of the post')
     featured_image = models.ImageField(upload_to='posts/%Y/%m/%d/', null=True, blank=True)
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized copies, maintained by apps.blog.images')
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, related_name='posts')
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='blog_posts')
     
@@ -45,8 +49,13 @@ class Post(models.Model):
     published_at = models.DateTimeField(null=True, blank=True)
     scheduled_publish_at = models.DateTimeField(null=True, blank=True, help_text='Schedule this post to go live at specific date and time')
     
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=1, editable=False, help_text='Estimated reading time in minutes')
     views_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0, help_text='Approved comments, maintained by apps.blog.counters')
+    reaction_count = models.IntegerField(default=0, help_text='Reactions, maintained by apps.blog.counters')
     featured = models.BooleanField(default=False, help_text='Show this post on featured section')
+    related_stale = models.BooleanField(default=False, editable=False, help_text='Related posts need recomputing, see apps.blog.related')
 
     class Meta:
         ordering = ['-published_at', '-created_at']
@@ -55,6 +64,14 @@ class Post(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['status']),
             models.Index(fields=['category']),
+            # Keyset pagination: (published_at, id) for public lists, (created_at, id) for admin
+            models.Index(fields=['status', 'is_visible', '-published_at', '-id']),
+            models.Index(fields=['category', '-published_at', '-id']),
+            models.Index(fields=['-created_at', '-id']),
+            # Scheduled publishing: due drafts and the next due time
+            models.Index(fields=['status', 'scheduled_publish_at']),
+            # Posts whose related posts are waiting for `rebuild_related_posts --stale`
+            models.Index(fields=['id'], condition=Q(related_stale=True), name='blog_post_related_stale_idx'),
         ]
 
     def __str__(self):
@@ -63,27 +80,43 @@ class Post(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if self.status == 'published' and self.published_at is None:
+            # Listings paginate on published_at, so published posts always carry one
+            self.published_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            if 'content' not in self.get_deferred_fields():
+                self.update_reading_stats()
+                if update_fields is not None:
+                    kwargs['update_fields'] = set(update_fields) | {'word_count', 'reading_time'}
         super().save(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse('blog:post-detail', kwargs={'slug': self.slug})
 
-    @property
-    def reading_time(self):
+    @classmethod
+    def estimate_reading_time(cls, word_count):
         """Estimate reading time in minutes"""
-        word_count = len(self.content.split())
-        return max(1, word_count // 200)
+        return max(1, word_count // cls.WORDS_PER_MINUTE)
+
+    def update_reading_stats(self):
+        """Recompute the stored word count and reading time from content"""
+        self.word_count = len(self.content.split())
+        self.reading_time = self.estimate_reading_time(self.word_count)
 
     @property
     def total_reactions(self):
-        return self.reactions.count()
+        return self.reaction_count
 
     @property
     def total_comments(self):
-        return self.comments.filter(is_approved=True).count()
+        return self.comment_count
 
 
 class Comment(models.Model):
+    PATH_SEGMENT_WIDTH = 10
+    MAX_DEPTH = 8
+
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
@@ -92,15 +125,40 @@ class Comment(models.Model):
     is_approved = models.BooleanField(default=True)
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
 
+    # Materialized path: the top-level comment of the thread, plus the
+    # zero-padded ids from the root down to this comment. Sorting a thread by
+    # path yields its replies depth-first, oldest first.
+    thread = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='+', editable=False)
+    path = models.CharField(max_length=(PATH_SEGMENT_WIDTH + 1) * (MAX_DEPTH + 1), blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['post', '-created_at']),
+            models.Index(fields=['post', 'depth', '-id']),
+            models.Index(fields=['thread', 'path']),
         ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
 
+    def save(self, *args, **kwargs):
+        creating = self.pk is None
+        if creating and self.parent_id:
+            # Replies beyond MAX_DEPTH attach to their parent's parent so paths stay bounded
+            while self.parent.depth >= self.MAX_DEPTH:
+                self.parent = self.parent.parent
+            self.thread_id = self.parent.thread_id
+            self.depth = self.parent.depth + 1
+        super().save(*args, **kwargs)
+        if creating and not self.path:
+            segment = str(self.pk).zfill(self.PATH_SEGMENT_WIDTH)
+            self.path = f'{self.parent.path}/{segment}' if self.parent_id else segment
+            if not self.parent_id:
+                self.thread_id = self.pk
+            Comment.objects.filter(pk=self.pk).update(path=self.path, thread_id=self.thread_id)
+
 
 class Reaction(models.Model):
     REACTION_CHOICES = (
@@ -128,6 +186,50 @@ class Reaction(models.Model):
         return f'{self.user.username} {self.reaction_type} {self.post.title}'
 
 
+class ReactionTally(models.Model):
+    """Per-post reaction histogram, maintained incrementally by apps.blog.counters"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='reaction_tallies')
+    reaction_type = models.CharField(max_length=20, choices=Reaction.REACTION_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('post', 'reaction_type')
+
+    def __str__(self):
+        return f'{self.post_id} {self.reaction_type}: {self.count}'
+
+
+class SearchTerm(models.Model):
+    """Inverted index entry: one row per (term, post) with a field-weighted score"""
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.FloatField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return f'{self.term} -> {self.post_id}'
+
+
+class RelatedPost(models.Model):
+    """Precomputed content-similarity neighbours of a post, best match first"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_entries')
+    related = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='related_from')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['post', 'rank']
+        unique_together = ('post', 'related')
+        indexes = [
+            models.Index(fields=['post', 'rank']),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} ~ {self.related_id} ({self.score:.2f})'
+
+
 class Newsletter(models.Model):
     email = models.EmailField(unique=True)
     subscribed_at = models.DateTimeField(auto_now_add=True)
@@ -135,3 +237,59 @@ class Newsletter(models.Model):
 
     def __str__(self):
         return self.email
+
+
+class NewsletterIssue(models.Model):
+    subject = models.CharField(max_length=200)
+    body = models.TextField(help_text='HTML content of the issue')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, help_text='When every active subscriber had been sent this issue')
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class NewsletterDelivery(models.Model):
+    """One row per recipient of an issue; lets an interrupted send resume without duplicates"""
+    issue = models.ForeignKey(NewsletterIssue, on_delete=models.CASCADE, related_name='deliveries')
+    subscriber = models.ForeignKey(Newsletter, on_delete=models.CASCADE, related_name='deliveries')
+    claimed_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('issue', 'subscriber')
+
+    def __str__(self):
+        return f'{self.issue} to {self.subscriber}'
+
+
+class DailyStat(models.Model):
+    """One day's value of a dashboard metric, maintained by apps.blog.stats"""
+    METRIC_CHOICES = (
+        ('posts_published', 'Posts published'),
+        ('comments', 'Comments'),
+        ('reactions', 'Reactions'),
+        ('views', 'Views'),
+        ('total_posts', 'Total posts'),
+        ('published_posts', 'Published posts'),
+        ('draft_posts', 'Draft posts'),
+        ('total_comments', 'Total comments'),
+        ('total_reactions', 'Total reactions'),
+    )
+
+    date = models.DateField()
+    metric = models.CharField(max_length=32, choices=METRIC_CHOICES)
+    dimension = models.CharField(max_length=64, blank=True, help_text='Empty for the overall value, else e.g. "post:12", "category:3" or a reaction type')
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'metric', 'dimension')
+        indexes = [
+            models.Index(fields=['metric', 'dimension', 'date']),
+        ]
+
+    def __str__(self):
+        return f'{self.date} {self.metric} {self.dimension}: {self.value}'
@@ -0,0 +1,141 @@
+"""
+Newsletter dispatch.
+
+Active subscribers are read in keyset batches (id > last id, LIMIT n), so
+memory stays flat however long the list is. Before a batch is handed to a
+worker thread it is claimed with NewsletterDelivery rows; the worker renders
+the issue once, sends the whole batch over one SMTP connection and reports
+which addresses were accepted. Accepted claims are stamped with sent_at and
+rejected ones are released so a later run retries them. Subscribers with a
+claim are skipped on resume, so an interrupted send never mails anyone
+twice; claims left unstamped by a crash are reported as unconfirmed.
+
+All database writes happen on the calling thread: workers only render and
+talk SMTP, which keeps SQLite free of competing writers.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import Newsletter, NewsletterDelivery
+
+logger = logging.getLogger(__name__)
+
+
+def pending_subscribers(issue):
+    """Active subscribers with no delivery claim for the issue"""
+    claimed = NewsletterDelivery.objects.filter(issue=issue, subscriber=OuterRef('pk'))
+    return Newsletter.objects.filter(is_active=True).exclude(Exists(claimed))
+
+
+def iter_batches(issue, batch_size):
+    """Yield lists of (subscriber_id, email), walking the subscriber ids in order"""
+    last_id = 0
+    while True:
+        batch = list(
+            pending_subscribers(issue)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'email')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def claim(issue, batch):
+    NewsletterDelivery.objects.bulk_create(
+        [NewsletterDelivery(issue=issue, subscriber_id=subscriber_id) for subscriber_id, _ in batch],
+        ignore_conflicts=True,
+    )
+
+
+def record(issue, sent_ids, failed_ids):
+    with transaction.atomic():
+        if sent_ids:
+            NewsletterDelivery.objects.filter(issue=issue, subscriber_id__in=sent_ids).update(sent_at=timezone.now())
+        if failed_ids:
+            NewsletterDelivery.objects.filter(issue=issue, subscriber_id__in=failed_ids).delete()
+
+
+def render_issue(issue):
+    """Return (text, html) bodies for an issue"""
+    html = render_to_string('emails/newsletter.html', {'issue': issue})
+    return strip_tags(html), html
+
+
+def send_batch(issue, batch):
+    """Send one batch over a single connection. Returns (sent_ids, failed_ids)."""
+    text, html = render_issue(issue)
+    sent_ids, failed_ids = [], []
+    try:
+        with get_connection() as connection:
+            for subscriber_id, email in batch:
+                message = EmailMultiAlternatives(
+                    issue.subject, text, settings.DEFAULT_FROM_EMAIL, [email], connection=connection
+                )
+                message.attach_alternative(html, 'text/html')
+                try:
+                    delivered = message.send()
+                except Exception:
+                    logger.exception('Newsletter %s: could not send to %s', issue.pk, email)
+                    delivered = 0
+                (sent_ids if delivered else failed_ids).append(subscriber_id)
+    except Exception:
+        # Connection failed to open or dropped; release everything not yet sent
+        logger.exception('Newsletter %s: batch aborted', issue.pk)
+        done = set(sent_ids)
+        failed_ids = [subscriber_id for subscriber_id, _ in batch if subscriber_id not in done]
+    return sent_ids, failed_ids
+
+
+def dispatch(issue, batch_size=None, workers=None, progress=None):
+    """
+    Send an issue to every active subscriber who has not been claimed yet.
+    Returns a dict with sent, failed and elapsed seconds.
+    """
+    batch_size = batch_size or settings.NEWSLETTER_BATCH_SIZE
+    workers = workers or settings.NEWSLETTER_WORKERS
+    sent = failed = 0
+    started = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+
+        def collect(done):
+            nonlocal sent, failed
+            for future in done:
+                sent_ids, failed_ids = future.result()
+                record(issue, sent_ids, failed_ids)
+                sent += len(sent_ids)
+                failed += len(failed_ids)
+                if progress:
+                    progress(sent, failed, time.monotonic() - started)
+
+        for batch in iter_batches(issue, batch_size):
+            claim(issue, batch)
+            in_flight.add(executor.submit(send_batch, issue, batch))
+            # Keep at most two batches per worker in memory
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(wait(in_flight).done)
+
+    if not failed and not pending_subscribers(issue).exists():
+        issue.sent_at = timezone.now()
+        issue.save(update_fields=['sent_at'])
+    return {'sent': sent, 'failed': failed, 'elapsed': time.monotonic() - started}
+
+
+def unconfirmed(issue):
+    """Claims a previous run never stamped as sent, e.g. because it was killed mid-batch"""
+    return NewsletterDelivery.objects.filter(issue=issue, sent_at__isnull=True)
@@ -0,0 +1,157 @@
+"""
+Full-page response cache for anonymous visitors.
+
+Cached pages are keyed by URL plus the current value of one or more
+generation counters ("scopes"): the site-wide scope and one scope per
+category. Content changes bump the relevant counters from signal handlers,
+which orphans every page rendered against the old generation. Edits are
+visible on the next request without relying on TTLs, and stale entries age
+out of the cache on their own.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .models import Post
+
+SITE_SCOPE = 'site'
+KEY_PREFIX = 'pagecache'
+STATS_KEYS = {
+    'hits': f'{KEY_PREFIX}:stats:hits',
+    'misses': f'{KEY_PREFIX}:stats:misses',
+}
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def _generation_key(scope):
+    return f'{KEY_PREFIX}:gen:{scope}'
+
+
+def _initial_generation():
+    # Never reuse a generation if the counter key is evicted and recreated
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    missing = {key: _initial_generation() for key in keys if key not in current}
+    for key, value in missing.items():
+        if not cache.add(key, value, timeout=None):
+            missing[key] = cache.get(key, value)
+    current.update(missing)
+    return [current[key] for key in keys]
+
+
+def _changed_key(scope):
+    return f'{KEY_PREFIX}:changed:{scope}'
+
+
+def bump(*scopes):
+    """Invalidate every cached page rendered under the given scopes"""
+    scopes = set(scopes)
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_generation(), timeout=None)
+    now = time.time()
+    cache.set_many({_changed_key(scope): now for scope in scopes}, timeout=None)
+
+
+def last_changed(scopes):
+    """
+    Unix time of the latest bump across the given scopes, or None when any
+    of them has not been bumped since the cache was last emptied.
+    """
+    keys = [_changed_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    if len(values) != len(keys):
+        return None
+    return max(values.values())
+
+
+def invalidate_categories(category_ids):
+    """Invalidate site-wide pages plus pages scoped to the given categories"""
+    bump(SITE_SCOPE, *(category_scope(category_id) for category_id in category_ids))
+
+
+def invalidate_posts(post_ids):
+    """Invalidate pages showing any of the given posts"""
+    category_ids = set(Post.objects.filter(pk__in=post_ids).order_by().values_list('category_id', flat=True))
+    invalidate_categories(category_ids)
+
+
+def is_enabled():
+    return settings.PAGE_CACHE_ENABLED
+
+
+def is_anonymous_read(request):
+    """An anonymous GET/HEAD without pending flash messages: the page is the same for every such visitor"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if CookieStorage.cookie_name in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def is_cacheable(request):
+    return is_enabled() and is_anonymous_read(request)
+
+
+def make_key(request, scopes):
+    generations = get_generations(scopes)
+    fingerprint = '|'.join([request.get_full_path()] + [f'{s}={g}' for s, g in zip(scopes, generations)])
+    return f'{KEY_PREFIX}:page:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+
+
+def _record(outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    values = cache.get_many(STATS_KEYS.values())
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(100 * stats['hits'] / lookups, 1) if lookups else 0
+    return stats
+
+
+def lookup(request, key):
+    """Return a cached (response, meta) pair, or None on a miss"""
+    entry = cache.get(key)
+    if entry is None:
+        _record('misses')
+        return None
+    _record('hits')
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = 'HIT'
+    # Pages read the CSRF token from the cookie; make sure the visitor has one
+    get_token(request)
+    return response, entry['meta']
+
+
+def store(key, response, meta=None, timeout=None):
+    """Cache a rendered 200 response"""
+    if response.status_code != 200 or response.streaming:
+        return
+    cache.set(key, {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'meta': meta or {},
+    }, timeout=settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+    response['X-Page-Cache'] = 'MISS'
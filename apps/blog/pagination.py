@@ -0,0 +1,177 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by an opaque cursor holding the sort key of the row the
+page starts after (or before, when paging backwards). Each page is a single
+indexed range scan with LIMIT per_page + 1: no COUNT(*) and no OFFSET, so
+page 1000 costs the same as page 1. The ordering must end in a unique
+column (normally the primary key) so every row has a distinct position.
+"""
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder truncates datetimes to milliseconds; cursors need them exact"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """A page of results plus the cursors of its neighbours"""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], NEXT)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], PREVIOUS)
+        return None
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by the given ordering, e.g. ('-published_at', '-id').
+    Ordering names may be model fields or annotations on the queryset.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def encode_cursor(self, obj, direction):
+        payload = json.dumps([direction, self._key(obj)], cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if direction not in (NEXT, PREVIOUS) or len(values) != len(self.fields):
+                raise ValueError(cursor)
+            return direction, [self._to_python(field, value) for field, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError) as e:
+            raise InvalidCursor(str(e))
+
+    def _to_python(self, field_name, value):
+        try:
+            field = self.queryset.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a search rank) travel as plain JSON values
+            return value
+        return field.to_python(value)
+
+    def _beyond(self, values, forward):
+        """Q selecting rows strictly after (forward) or before the given key"""
+        clauses = []
+        for index, (field, descending) in enumerate(zip(self.fields, self.descending)):
+            lookup = 'lt' if descending == forward else 'gt'
+            equal = [Q(**{prefix: value}) for prefix, value in zip(self.fields[:index], values[:index])]
+            clauses.append(reduce(and_, equal + [Q(**{f'{field}__{lookup}': values[index]})]))
+        return reduce(or_, clauses)
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _page_query(self, cursor):
+        """(queryset fetching per_page + 1 rows, cursor direction or None)"""
+        if not cursor:
+            return self.queryset.order_by(*self.ordering)[:self.per_page + 1], None
+        direction, values = self.decode_cursor(cursor)
+        if direction == NEXT:
+            return self.queryset.filter(self._beyond(values, True)).order_by(*self.ordering)[:self.per_page + 1], NEXT
+        return self.queryset.filter(self._beyond(values, False)).order_by(*self._reversed_ordering())[:self.per_page + 1], PREVIOUS
+
+    def _build_page(self, rows, direction):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction is None:
+            return KeysetPage(rows, self, more, False)
+        if direction == NEXT:
+            return KeysetPage(rows, self, more, True)
+        return KeysetPage(rows[::-1], self, True, more)
+
+    def page(self, cursor=None):
+        queryset, direction = self._page_query(cursor)
+        return self._build_page(list(queryset), direction)
+
+    async def apage(self, cursor=None):
+        queryset, direction = self._page_query(cursor)
+        return self._build_page([row async for row in queryset], direction)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin replacing page-number pagination with cursors"""
+    keyset_ordering = ('-published_at', '-id')
+    cursor_kwarg = 'cursor'
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if getattr(self, 'prefetched_page', None) is not None:
+            return self.prefetched_page
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering())
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    async def aprefetch_page(self):
+        """For async views: fetch the page of self.object_list before get_context_data() runs"""
+        paginator = KeysetPaginator(self.object_list, self.get_paginate_by(self.object_list), self.get_keyset_ordering())
+        try:
+            page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        self.prefetched_page = (paginator, page, page.object_list, page.has_other_pages())
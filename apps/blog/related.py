@@ -0,0 +1,123 @@
+"""
+Content-similarity index for "related posts".
+
+Posts are compared as TF-IDF vectors built on the search index (SearchTerm):
+a post's most distinctive terms are scored against every other published
+post that shares them, and the top matches are stored in RelatedPost.
+PostDetailView then reads them with one indexed lookup. Publishing or
+editing a post refreshes its own neighbours inline and marks the posts it
+is now related to as stale; `rebuild_related_posts --stale` refreshes
+those in the background, so a save pays for one recompute, not seven.
+"""
+import math
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from .models import Post, RelatedPost, SearchTerm
+from .search import post_count
+
+TOP_K = 6
+QUERY_TERMS = 25
+
+
+def _published(queryset):
+    return queryset.filter(status='published', is_visible=True)
+
+
+def compute_neighbours(post_id, total_posts=None):
+    """Return [(related_post_id, score), ...] for a post, best first"""
+    weights = dict(SearchTerm.objects.filter(post_id=post_id).values_list('term', 'weight'))
+    if not weights:
+        return []
+
+    doc_freq = dict(
+        SearchTerm.objects.filter(term__in=list(weights))
+        .values_list('term')
+        .annotate(df=Count('id'))
+        .order_by()
+    )
+    if total_posts is None:
+        total_posts = Post.objects.count()
+
+    # Terms found only in this post cannot link it to anything
+    scored = {
+        term: weight * math.log(1 + total_posts / doc_freq[term])
+        for term, weight in weights.items()
+        if doc_freq.get(term, 0) > 1
+    }
+    top_terms = sorted(scored, key=scored.get, reverse=True)[:QUERY_TERMS]
+    if not top_terms:
+        return []
+
+    # Dot product of the two TF-IDF vectors over the query terms
+    query_weight = Case(
+        *[
+            When(term=term, then=Value(scored[term] * math.log(1 + total_posts / doc_freq[term])))
+            for term in top_terms
+        ],
+        output_field=FloatField(),
+    )
+    matches = (
+        SearchTerm.objects.filter(term__in=top_terms, post__status='published', post__is_visible=True)
+        .exclude(post_id=post_id)
+        .values('post')
+        .annotate(score=Sum(F('weight') * query_weight))
+        .order_by('-score', '-post')[:TOP_K]
+    )
+    return [(row['post'], row['score']) for row in matches]
+
+
+def store_neighbours(post_id, neighbours):
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id=post_id).delete()
+        RelatedPost.objects.bulk_create([
+            RelatedPost(post_id=post_id, related_id=related_id, score=score, rank=rank)
+            for rank, (related_id, score) in enumerate(neighbours)
+        ])
+
+
+def update_post(post):
+    """Refresh the neighbours of a post and mark the posts it is now related to as stale"""
+    if post.status != 'published' or not post.is_visible:
+        RelatedPost.objects.filter(post_id=post.pk).delete()
+        return
+
+    neighbours = compute_neighbours(post.pk, post_count())
+    store_neighbours(post.pk, neighbours)
+    if neighbours:
+        Post.objects.filter(pk__in=[related_id for related_id, _ in neighbours]).update(related_stale=True)
+
+
+def refresh_stale(batch_size=500):
+    """Recompute neighbours for posts marked stale, returning how many were processed"""
+    total_posts = post_count()
+    processed = 0
+    while True:
+        post_ids = list(Post.objects.filter(related_stale=True).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not post_ids:
+            return processed
+        # Clear the mark first, so a post marked again while it is recomputed stays marked
+        Post.objects.filter(pk__in=post_ids).update(related_stale=False)
+        for post_id in post_ids:
+            store_neighbours(post_id, compute_neighbours(post_id, total_posts))
+        processed += len(post_ids)
+
+
+def rebuild(batch_size=500):
+    """Recompute neighbours for every published post, returning how many were processed"""
+    total_posts = Post.objects.count()
+    processed = 0
+    post_ids = _published(Post.objects).order_by('id').values_list('id', flat=True)
+    with transaction.atomic():
+        Post.objects.filter(related_stale=True).update(related_stale=False)
+        RelatedPost.objects.exclude(post__in=_published(Post.objects)).delete()
+        for post_id in post_ids.iterator(chunk_size=batch_size):
+            store_neighbours(post_id, compute_neighbours(post_id, total_posts))
+            processed += 1
+    return processed
+
+
+def related_posts(post, limit=3):
+    """Published neighbours of a post, best first"""
+    return _published(Post.objects).filter(related_from__post=post).order_by('related_from__rank')[:limit]
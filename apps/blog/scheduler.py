@@ -0,0 +1,59 @@
+"""
+Scheduled publishing.
+
+Drafts with a scheduled_publish_at in the past are flipped to published by
+a single UPDATE filtered on status='draft', so when several hosts run the
+scheduler at once each post is published by exactly one of them: the
+losers' UPDATE simply matches no rows. The UPDATE stamps updated_at with
+the run's timestamp and only posts carrying that stamp are reported, so
+each post is also reported by exactly one run. queryset.update() bypasses
+the post_save handlers, so cache invalidation and the related-posts
+refresh are done here for the posts that went live.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Post
+from . import homepage, page_cache, related
+
+
+def due_drafts(now):
+    return Post.objects.filter(status='draft', scheduled_publish_at__lte=now)
+
+
+def publish_due(now=None):
+    """Publish every due draft. Returns the posts this call published."""
+    now = now or timezone.now()
+    candidate_ids = list(due_drafts(now).values_list('pk', flat=True))
+    if not candidate_ids:
+        return []
+
+    published = due_drafts(now).filter(pk__in=candidate_ids).update(
+        status='published',
+        published_at=F('scheduled_publish_at'),
+        # Doubles as this run's token: a rival run stamps its own now
+        updated_at=now,
+    )
+    if not published:
+        # Another scheduler got there first
+        return []
+
+    posts = list(
+        Post.objects.filter(pk__in=candidate_ids, status='published', updated_at=now).defer('content')
+    )
+    page_cache.invalidate_categories({post.category_id for post in posts})
+    homepage.invalidate()
+    for post in posts:
+        related.update_post(post)
+    return posts
+
+
+def next_due(now=None):
+    """When the next scheduled draft is due, or None"""
+    now = now or timezone.now()
+    return (
+        Post.objects.filter(status='draft', scheduled_publish_at__gt=now)
+        .order_by('scheduled_publish_at')
+        .values_list('scheduled_publish_at', flat=True)
+        .first()
+    )
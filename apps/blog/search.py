@@ -0,0 +1,164 @@
+"""
+Inverted-index full-text search over Post title, excerpt and content.
+
+Each post is tokenized once at save time into SearchTerm rows holding a
+field-weighted, log-scaled term frequency. Queries look terms up through the
+(term, post) unique index and rank matches by a TF-IDF style score, so search
+cost depends on how many posts contain the query terms rather than on the
+size of the archive. The post total used for IDF is cached rather than
+counted per search; post creation, deletion and bulk indexing drop it.
+"""
+import math
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, Value, When
+
+from .models import Post, SearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Relative importance of a term depending on where it appears
+FIELD_WEIGHTS = {
+    'title': 5.0,
+    'excerpt': 2.0,
+    'content': 1.0,
+}
+
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that
+    the this to was were will with
+""".split())
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+
+INDEXED_FIELDS = frozenset(FIELD_WEIGHTS)
+
+POST_COUNT_KEY = 'blog:search:post-count'
+# Safety net only; IDF tolerates a slightly stale total
+POST_COUNT_TIMEOUT = 60 * 60
+
+
+def tokenize(text):
+    """Split text into normalized index terms"""
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def build_terms(title, excerpt, content):
+    """Return a {term: weight} mapping for a post's searchable fields"""
+    scores = {}
+    for field, text in (('title', title), ('excerpt', excerpt), ('content', content)):
+        field_weight = FIELD_WEIGHTS[field]
+        for token in tokenize(text):
+            scores[token] = scores.get(token, 0.0) + field_weight
+    # Dampen raw frequencies so long posts do not dominate every query
+    return {term: 1.0 + math.log(score) for term, score in scores.items()}
+
+
+def _entries_for(post_id, title, excerpt, content):
+    return [
+        SearchTerm(post_id=post_id, term=term, weight=weight)
+        for term, weight in build_terms(title, excerpt, content).items()
+    ]
+
+
+def post_count():
+    """Number of posts, for IDF; cached so searches do not COUNT(*) the posts table"""
+    return cache.get_or_set(POST_COUNT_KEY, Post.objects.count, POST_COUNT_TIMEOUT)
+
+
+def invalidate_post_count():
+    cache.delete(POST_COUNT_KEY)
+
+
+def index_post(post):
+    """(Re)build the index entries for a single post"""
+    entries = _entries_for(post.pk, post.title, post.excerpt, post.content)
+    with transaction.atomic():
+        SearchTerm.objects.filter(post_id=post.pk).delete()
+        SearchTerm.objects.bulk_create(entries)
+
+
+def index_new_posts(posts, batch_size=500):
+    """Add index entries for freshly inserted posts (e.g. from bulk_create), which have none yet"""
+    entries = []
+    for post in posts:
+        entries.extend(_entries_for(post.pk, post.title, post.excerpt, post.content))
+    SearchTerm.objects.bulk_create(entries, batch_size=batch_size)
+    invalidate_post_count()
+
+
+def rebuild_index(batch_size=500):
+    """Drop and rebuild the whole index, returning the number of posts indexed"""
+    indexed = 0
+    with transaction.atomic():
+        SearchTerm.objects.all().delete()
+        entries = []
+        rows = Post.objects.values_list('id', 'title', 'excerpt', 'content').order_by('id')
+        for post_id, title, excerpt, content in rows.iterator(chunk_size=batch_size):
+            entries.extend(_entries_for(post_id, title, excerpt, content))
+            indexed += 1
+            if indexed % batch_size == 0:
+                SearchTerm.objects.bulk_create(entries, batch_size=batch_size)
+                entries = []
+        SearchTerm.objects.bulk_create(entries, batch_size=batch_size)
+    invalidate_post_count()
+    return indexed
+
+
+def parse_query(query):
+    """Return the unique index terms of a search query, in order"""
+    terms = []
+    for term in tokenize(query):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def search_posts(queryset, query):
+    """
+    Restrict a Post queryset to posts containing every term of the query,
+    annotated with `search_rank` and ordered by relevance.
+    """
+    terms = parse_query(query)
+    if not terms:
+        return queryset.none()
+
+    doc_freq = dict(
+        SearchTerm.objects.filter(term__in=terms)
+        .values_list('term')
+        .annotate(df=Count('id'))
+        .order_by()
+    )
+    if len(doc_freq) < len(terms):
+        # At least one term matches nothing, so no post can contain them all
+        return queryset.none()
+
+    total_posts = max(post_count(), 1)
+    idf = Case(
+        *[When(term=term, then=Value(math.log(1 + total_posts / df))) for term, df in doc_freq.items()],
+        output_field=FloatField(),
+    )
+
+    matching = (
+        SearchTerm.objects.filter(term__in=terms)
+        .values('post')
+        .annotate(hits=Count('id'))
+        .filter(hits=len(terms))
+        .values('post')
+    )
+    rank = (
+        SearchTerm.objects.filter(post=OuterRef('pk'), term__in=terms)
+        .values('post')
+        .annotate(rank=Sum(F('weight') * idf))
+        .values('rank')
+    )
+    return queryset.filter(pk__in=matching).annotate(
+        search_rank=Subquery(rank, output_field=FloatField())
+    ).order_by('-search_rank', '-published_at')
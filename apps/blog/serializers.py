@@ -0,0 +1,98 @@
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import Category, Comment, Post
+
+
+class SparseFieldsMixin:
+    """
+    Serialize only the fields named in ?fields=a,b,c (unknown names are
+    ignored, but naming only unknown fields is a 400 that lists the valid
+    ones). Without the parameter a serializer may still narrow itself to
+    `default_fields`, e.g. to leave `content` out of list responses.
+    """
+    default_fields = None
+
+    @classmethod
+    def requested_fields(cls, request, default=None):
+        """The field names a request asks for, or the given default"""
+        raw = request.query_params.get('fields') if request is not None else None
+        if raw:
+            names = {name.strip() for name in raw.split(',') if name.strip()}
+            if not names & set(cls.Meta.fields):
+                raise ValidationError({'fields': [f"No valid fields requested; choose from {', '.join(cls.Meta.fields)}"]})
+            return names
+        return set(default) if default is not None else None
+
+    def __init__(self, *args, **kwargs):
+        default_fields = kwargs.pop('default_fields', self.default_fields)
+        super().__init__(*args, **kwargs)
+        wanted = self.requested_fields(self.context.get('request'), default_fields)
+        if wanted:
+            for name in set(self.fields) - set(wanted):
+                self.fields.pop(name)
+
+
+class AuthorSerializer(serializers.Serializer):
+    username = serializers.CharField()
+    name = serializers.SerializerMethodField()
+
+    def get_name(self, user):
+        return user.get_full_name() or user.username
+
+
+class CategorySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'color']
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    post_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Category
+        fields = ['id', 'name', 'slug', 'description', 'color', 'post_count']
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    author = AuthorSerializer(read_only=True)
+    category = CategorySummarySerializer(read_only=True)
+    featured_image = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Post
+        fields = [
+            'id', 'title', 'slug', 'url', 'excerpt', 'content', 'author', 'category',
+            'featured_image', 'image_variants', 'featured', 'published_at', 'updated_at',
+            'word_count', 'reading_time', 'views_count', 'comment_count', 'reaction_count',
+        ]
+
+    def get_url(self, post):
+        request = self.context.get('request')
+        url = post.get_absolute_url()
+        return request.build_absolute_uri(url) if request else url
+
+    def get_featured_image(self, post):
+        return post.featured_image.url if post.featured_image else None
+
+    def get_image_variants(self, post):
+        """{'webp': [{'width': 480, 'url': ...}, ...], 'jpeg': [...]} once derivatives exist"""
+        variants = post.featured_image_variants
+        if not post.featured_image or variants.get('source') != post.featured_image.name:
+            return {}
+        return {
+            image_format: [{'width': width, 'url': default_storage.url(name)} for width, name in variants[image_format]]
+            for image_format in ('webp', 'jpeg')
+        }
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = AuthorSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'post', 'parent', 'thread', 'depth', 'author', 'content', 'created_at', 'updated_at']
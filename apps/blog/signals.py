@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Category, Comment, Post, Reaction
+from . import homepage, images, page_cache, related, search
+from .counters import adjust_post_counters, adjust_reaction_tally
+
+
+RELATED_FIELDS = search.INDEXED_FIELDS | {'status', 'is_visible'}
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created=False, update_fields=None, **kwargs):
+    """Keep the search and related-posts indexes in sync with post content"""
+    if created:
+        search.invalidate_post_count()
+    if update_fields and not RELATED_FIELDS.intersection(update_fields):
+        return
+    if not update_fields or search.INDEXED_FIELDS.intersection(update_fields):
+        search.index_post(instance)
+    # Related posts are computed from the search index, so refresh them second
+    related.update_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    # The post's SearchTerm rows go with it by cascade; only the total changes
+    search.invalidate_post_count()
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_approval(sender, instance, **kwargs):
+    """Remember the stored approval state so saves can compute counter deltas"""
+    instance._counted_approved = bool(instance.pk) and instance.__dict__.get('is_approved', False)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    """Keep Post.comment_count in step with approved comments"""
+    delta = int(instance.is_approved) - int(instance._counted_approved and not created)
+    if delta:
+        adjust_post_counters(instance.post_id, comments=delta)
+    instance._counted_approved = instance.is_approved
+
+
+def cascades_from_post(origin):
+    """Whether a delete was started by deleting posts, which takes their counters with them"""
+    return isinstance(origin, Post) or getattr(origin, 'model', None) is Post
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, origin=None, **kwargs):
+    if instance._counted_approved and not cascades_from_post(origin):
+        adjust_post_counters(instance.post_id, comments=-1)
+
+
+@receiver(post_init, sender=Reaction)
+def remember_reaction_type(sender, instance, **kwargs):
+    """Remember the stored reaction type so a switch moves the right histogram bucket"""
+    instance._counted_type = instance.__dict__.get('reaction_type') if instance.pk else None
+
+
+@receiver(post_save, sender=Reaction)
+def count_reaction(sender, instance, created, **kwargs):
+    """Keep Post.reaction_count and the reaction histogram in step with reactions"""
+    if created:
+        adjust_post_counters(instance.post_id, reactions=1)
+    elif instance._counted_type == instance.reaction_type:
+        return
+    elif instance._counted_type:
+        adjust_reaction_tally(instance.post_id, instance._counted_type, -1)
+    adjust_reaction_tally(instance.post_id, instance.reaction_type, 1)
+    instance._counted_type = instance.reaction_type
+
+
+@receiver(post_delete, sender=Reaction)
+def uncount_reaction(sender, instance, origin=None, **kwargs):
+    if cascades_from_post(origin):
+        return
+    adjust_post_counters(instance.post_id, reactions=-1)
+    adjust_reaction_tally(instance.post_id, instance._counted_type or instance.reaction_type, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    """Remember the stored category so a move invalidates both categories"""
+    instance._loaded_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'views_count'}:
+        return
+    page_cache.invalidate_categories({instance.category_id, instance._loaded_category_id})
+    homepage.invalidate()
+    instance._loaded_category_id = instance.category_id
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Reaction)
+@receiver(post_delete, sender=Reaction)
+def invalidate_post_feedback_pages(sender, instance, **kwargs):
+    page_cache.invalidate_posts([instance.post_id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    page_cache.invalidate_categories([instance.pk])
+    homepage.invalidate()
+
+
+@receiver(post_init, sender=Post)
+def remember_featured_image(sender, instance, **kwargs):
+    value = instance.__dict__.get('featured_image')
+    instance._loaded_featured_image = getattr(value, 'name', value) or ''
+
+
+@receiver(post_save, sender=Post)
+def render_featured_image_variants(sender, instance, update_fields=None, **kwargs):
+    """Resize a new or replaced featured image in the background"""
+    if update_fields and 'featured_image' not in update_fields:
+        return
+    name = instance.featured_image.name or ''
+    if name != instance._loaded_featured_image:
+        images.schedule(instance, 'featured_image', 'featured_image_variants', settings.POST_IMAGE_WIDTHS)
+    instance._loaded_featured_image = name
+
+
+@receiver(images.variants_stored, sender=Post)
+def invalidate_featured_image_pages(sender, pk, **kwargs):
+    page_cache.invalidate_posts([pk])
+    homepage.invalidate()
@@ -0,0 +1,206 @@
+"""
+Daily statistics rollups for the admin dashboard.
+
+DailyStat holds one row per (day, metric, dimension):
+
+- Event metrics count what happened on a day: posts published, approved
+  comments, and reactions (overall and per reaction type). `rollup()`
+  rebuilds them from the source tables for a trailing window of days, so a
+  periodic run only re-aggregates the rows that can still change.
+- Views have no timestamp in the source tables, so the view counter drain
+  adds them as it applies them (`record_views`), overall and per post and
+  category. They cannot be rebuilt and `rollup()` never touches them.
+- Gauges (`total_posts`, `draft_posts`, ...) snapshot the current totals
+  once per rollup, from a single aggregate over the posts table and its
+  stored counters.
+
+The dashboard reads only rollup rows: the latest gauges and a fixed window
+of daily values, however long the history grows.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Category, Comment, DailyStat, Post, Reaction
+
+EVENT_METRICS = ('posts_published', 'comments', 'reactions')
+SERIES_METRICS = EVENT_METRICS + ('views',)
+GAUGES = ('total_posts', 'published_posts', 'draft_posts', 'total_comments', 'total_reactions')
+BATCH_SIZE = 500
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _daily_counts(metric, queryset, field, dimension=None, prefix=''):
+    """DailyStat rows counting queryset rows per day of `field`, optionally per `dimension` value"""
+    group = ['day', dimension] if dimension else ['day']
+    rows = queryset.annotate(day=TruncDate(field)).values(*group).annotate(n=Count('id')).order_by()
+    return [
+        DailyStat(date=row['day'], metric=metric, dimension=f'{prefix}{row[dimension]}' if dimension else '', value=row['n'])
+        for row in rows
+        if not dimension or row[dimension] is not None
+    ]
+
+
+def event_rows(since=None):
+    """Rebuild the event metric rows for every day from `since` (or all of history)"""
+    posts = Post.objects.filter(status='published', published_at__isnull=False)
+    comments = Comment.objects.filter(is_approved=True)
+    reactions = Reaction.objects.all()
+    if since is not None:
+        start = _start_of(since)
+        posts = posts.filter(published_at__gte=start)
+        comments = comments.filter(created_at__gte=start)
+        reactions = reactions.filter(created_at__gte=start)
+    return (
+        _daily_counts('posts_published', posts, 'published_at')
+        + _daily_counts('posts_published', posts, 'published_at', 'category_id', 'category:')
+        + _daily_counts('comments', comments, 'created_at')
+        + _daily_counts('reactions', reactions, 'created_at')
+        + _daily_counts('reactions', reactions, 'created_at', 'reaction_type')
+    )
+
+
+def compute_totals():
+    """Current dashboard totals in one query, using the stored comment and reaction counters"""
+    return Post.objects.aggregate(
+        total_posts=Count('id'),
+        published_posts=Count('id', filter=Q(status='published')),
+        draft_posts=Count('id', filter=Q(status='draft')),
+        total_comments=Coalesce(Sum('comment_count'), 0),
+        total_reactions=Coalesce(Sum('reaction_count'), 0),
+    )
+
+
+def rollup(days=2, full=False):
+    """
+    Refresh the event metrics for the last `days` days (all of history with
+    `full`) and snapshot today's gauges. Returns the number of rows written.
+    """
+    today = timezone.localdate()
+    since = None if full else today - timedelta(days=days - 1)
+    rows = event_rows(since)
+    totals = compute_totals()
+    gauges = [DailyStat(date=today, metric=metric, dimension='', value=totals[metric]) for metric in GAUGES]
+
+    with transaction.atomic():
+        stale = DailyStat.objects.filter(metric__in=EVENT_METRICS)
+        if since is not None:
+            stale = stale.filter(date__gte=since)
+        stale.delete()
+        DailyStat.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        DailyStat.objects.bulk_create(
+            gauges, update_conflicts=True, unique_fields=['date', 'metric', 'dimension'], update_fields=['value'],
+        )
+    return len(rows) + len(gauges)
+
+
+def _increment(day, metric, amounts):
+    """Add {dimension: n} to the day's rows, creating them as needed"""
+    DailyStat.objects.bulk_create(
+        [DailyStat(date=day, metric=metric, dimension=dimension) for dimension in amounts],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    by_amount = defaultdict(list)
+    for dimension, amount in amounts.items():
+        by_amount[amount].append(dimension)
+    for amount, dimensions in by_amount.items():
+        for start in range(0, len(dimensions), BATCH_SIZE):
+            DailyStat.objects.filter(
+                date=day, metric=metric, dimension__in=dimensions[start:start + BATCH_SIZE]
+            ).update(value=F('value') + amount)
+
+
+def record_views(counts, day=None):
+    """Add a Counter of post id -> views to the day's view rollups; call inside the drain's transaction"""
+    day = day or timezone.localdate()
+    post_ids = list(counts)
+    categories = {}
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        categories.update(Post.objects.filter(pk__in=post_ids[start:start + BATCH_SIZE]).values_list('id', 'category_id'))
+
+    amounts = Counter()
+    for post_id, views in counts.items():
+        if post_id not in categories:
+            continue
+        amounts[''] += views
+        amounts[f'post:{post_id}'] += views
+        if categories[post_id] is not None:
+            amounts[f'category:{categories[post_id]}'] += views
+    if amounts:
+        _increment(day, 'views', amounts)
+
+
+def latest_totals():
+    """The most recent gauge snapshot, or live totals before the first rollup"""
+    snapshot = {}
+    for metric, value in DailyStat.objects.filter(metric__in=GAUGES, dimension='').order_by('-date').values_list('metric', 'value')[:len(GAUGES)]:
+        snapshot.setdefault(metric, value)
+    if len(snapshot) < len(GAUGES):
+        return compute_totals()
+    return snapshot
+
+
+def series(days=30):
+    """
+    Daily values of each series metric over the last `days` days, as
+    [{'metric', 'label', 'total', 'points': [{'date', 'value', 'percent'}]}]
+    """
+    today = timezone.localdate()
+    dates = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+    values = defaultdict(dict)
+    for day, metric, value in DailyStat.objects.filter(
+        metric__in=SERIES_METRICS, dimension='', date__gte=dates[0]
+    ).values_list('date', 'metric', 'value'):
+        values[metric][day] = value
+
+    labels = dict(DailyStat.METRIC_CHOICES)
+    result = []
+    for metric in SERIES_METRICS:
+        peak = max(values[metric].values(), default=0)
+        result.append({
+            'metric': metric,
+            'label': labels[metric],
+            'total': sum(values[metric].values()),
+            'points': [
+                {'date': day, 'value': values[metric].get(day, 0), 'percent': round(100 * values[metric].get(day, 0) / peak) if peak else 0}
+                for day in dates
+            ],
+        })
+    return result
+
+
+def _top(metric, prefix, since, limit):
+    rows = DailyStat.objects.filter(
+        metric=metric, dimension__startswith=prefix, date__gte=since
+    ).values('dimension').annotate(total=Sum('value')).order_by('-total')[:limit]
+    return [(int(row['dimension'][len(prefix):]), row['total']) for row in rows]
+
+
+def top_viewed(days=30, limit=5):
+    """The most viewed posts and categories over the last `days` days, as (object, views) pairs"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    posts = _top('views', 'post:', since, limit)
+    categories = _top('views', 'category:', since, limit)
+    post_objects = Post.objects.only('id', 'title', 'slug').in_bulk([pk for pk, _ in posts])
+    category_objects = Category.objects.only('id', 'name', 'slug', 'color').in_bulk([pk for pk, _ in categories])
+    return (
+        [(post_objects[pk], views) for pk, views in posts if pk in post_objects],
+        [(category_objects[pk], views) for pk, views in categories if pk in category_objects],
+    )
+
+
+def reactions_by_type(days=30):
+    """Reaction counts per type over the last `days` days, most common first"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    labels = dict(Reaction.REACTION_CHOICES)
+    rows = DailyStat.objects.filter(
+        metric='reactions', date__gte=since
+    ).exclude(dimension='').values('dimension').annotate(total=Sum('value')).order_by('-total')
+    return [(labels.get(row['dimension'], row['dimension']), row['total']) for row in rows]
@@ -0,0 +1,34 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+
+def _current(image, variants):
+    """Variants only apply while they were rendered from the image currently stored"""
+    if image and variants and variants.get('source') == image.name:
+        return variants
+    return None
+
+
+@register.filter
+def srcset(variants, image_format='jpeg'):
+    """Render a variant map as a srcset attribute value"""
+    if not variants:
+        return ''
+    return ', '.join(f'{default_storage.url(name)} {width}w' for width, name in variants.get(image_format, []))
+
+
+@register.inclusion_tag('partials/responsive_image.html')
+def responsive_image(image, variants, alt='', sizes='100vw', css_class='', loading='lazy'):
+    """<picture> with WebP and JPEG srcsets, or a plain <img> until derivatives exist"""
+    variants = _current(image, variants)
+    return {
+        'image': image,
+        'variants': variants,
+        'fallback': default_storage.url(variants['jpeg'][-1][1]) if variants else image.url,
+        'alt': alt,
+        'sizes': sizes,
+        'css_class': css_class,
+        'loading': loading,
+    }
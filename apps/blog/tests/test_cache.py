@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from config.cache import TwoTierCache
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    """Two backend instances on one file stand in for two worker processes"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, 'cache.sqlite3')
+        self.first = TwoTierCache(path, {})
+        self.second = TwoTierCache(path, {})
+
+    def test_local_copy_is_dropped_as_soon_as_another_process_writes(self):
+        self.first.set('key', 'old')
+        self.assertEqual(self.first.get('key'), 'old')
+        self.second.set('key', 'new')
+        self.assertEqual(self.first.get('key'), 'new')
+        self.second.delete('key')
+        self.assertIsNone(self.first.get('key'))
+
+    def test_value_invalidated_while_computing_is_not_stored(self):
+        def compute():
+            # An edit lands while the value is being computed from the old data
+            self.second.delete('aggregates')
+            return 'stale'
+
+        self.assertEqual(self.first.get_or_set('aggregates', compute), 'stale')
+        self.assertIsNone(self.second.get('aggregates'))
+        self.assertIsNone(self.first.get('aggregates'))
+        self.assertEqual(self.first.get_or_set('aggregates', lambda: 'fresh'), 'fresh')
+        self.assertEqual(self.second.get('aggregates'), 'fresh')
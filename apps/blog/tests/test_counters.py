@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TransactionTestCase
+
+from apps.blog.counters import set_reaction
+from apps.blog.models import Post, Reaction, ReactionTally
+
+
+class DeleteWithReactionsTests(TransactionTestCase):
+    """Cascading deletes must not trip the reaction counters (they run outside atomic blocks here)"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='x')
+        self.reader = User.objects.create_user('reader', password='x')
+        self.post = Post.objects.create(title='Post', slug='post', content='Body', excerpt='Body',
+                                        author=self.author, status='published')
+        self.other = Post.objects.create(title='Other', slug='other', content='Body', excerpt='Body',
+                                         author=self.reader, status='published')
+        Reaction.objects.create(post=self.post, user=self.reader, reaction_type='love')
+        Reaction.objects.create(post=self.post, user=self.author, reaction_type='like')
+        Reaction.objects.create(post=self.other, user=self.author, reaction_type='wow')
+
+    def test_delete_post(self):
+        self.post.delete()
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(ReactionTally.objects.filter(post_id=self.post.pk).exists())
+
+    def test_delete_author_cascades_to_posts(self):
+        self.author.delete()
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        # The author's reaction on another post is uncounted
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.reaction_count, 0)
+        self.assertFalse(ReactionTally.objects.filter(post=self.other, count__lt=0).exists())
+        self.assertEqual(ReactionTally.objects.get(post=self.other, reaction_type='wow').count, 0)
+
+    def test_delete_reaction(self):
+        Reaction.objects.get(post=self.post, user=self.reader).delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.reaction_count, 1)
+        self.assertEqual(ReactionTally.objects.get(post=self.post, reaction_type='love').count, 0)
+
+
+class SetReactionTests(TransactionTestCase):
+    """Real transactions, so the post foreign key is checked on commit as in production"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='x')
+        self.reader = User.objects.create_user('reader', password='x')
+        self.post = Post.objects.create(title='Post', slug='post', content='Body', excerpt='Body',
+                                        author=self.author, status='published')
+
+    def counts(self):
+        self.post.refresh_from_db()
+        tallies = dict(ReactionTally.objects.filter(post=self.post, count__gt=0).values_list('reaction_type', 'count'))
+        return self.post.reaction_count, tallies
+
+    def test_first_reaction_and_switch(self):
+        set_reaction(self.post.pk, self.reader, 'like')
+        self.assertEqual(self.counts(), (1, {'like': 1}))
+        set_reaction(self.post.pk, self.reader, 'love')
+        self.assertEqual(self.counts(), (1, {'love': 1}))
+
+    def test_losing_a_race_to_the_same_first_reaction_counts_nothing(self):
+        # The other request's reaction committed between our check and our insert
+        set_reaction(self.post.pk, self.reader, 'like')
+        set_reaction(self.post.pk, self.reader, 'like')
+        self.assertEqual(self.counts(), (1, {'like': 1}))
+
+    def test_missing_post(self):
+        with self.assertRaises(IntegrityError):
+            set_reaction(self.post.pk + 100, self.reader, 'like')
+        self.assertFalse(Reaction.objects.exists())
@@ -0,0 +1,58 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from apps.blog import export
+from apps.blog.models import Post
+from apps.blog.views import AdminExportView
+
+
+class AsgiExportStreamingTests(TransactionTestCase):
+    """Under ASGI the export must still be read block by block, not collected first"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        for n in range(20):
+            Post.objects.create(title=f'Post {n}', slug=f'post-{n}', content='Body', excerpt='Body',
+                                author=self.admin, status='published')
+        self.rows_read = 0
+
+    def counting_rows(self, iter_rows):
+        def wrapper(kind):
+            for row in iter_rows(kind):
+                self.rows_read += 1
+                yield row
+        return wrapper
+
+    def get_export(self):
+        request = RequestFactory().get('/admin/export/posts/', {'format': 'ndjson'})
+        request.user = self.admin
+        return AdminExportView.as_view()(request, kind='posts')
+
+    @override_settings(RUNNING_ASGI=True)
+    def test_first_block_arrives_before_the_table_is_read(self):
+        with mock.patch.object(export, 'CHUNK_SIZE', 5), \
+                mock.patch.object(export, 'iter_rows', self.counting_rows(export.iter_rows)):
+            response = self.get_export()
+            self.assertTrue(response.is_async)
+
+            async def first_block_then_rest():
+                blocks = response.__aiter__()
+                first = await blocks.__anext__()
+                rows_after_first = self.rows_read
+                rest = [block async for block in blocks]
+                return first, rows_after_first, rest
+
+            first, rows_after_first, rest = async_to_sync(first_block_then_rest)()
+        self.assertLess(rows_after_first, 20)
+        self.assertEqual(self.rows_read, 20)
+        lines = b''.join([first] + rest).decode().splitlines()
+        self.assertEqual(len(lines), 20)
+        self.assertIn('"slug":"post-0"', lines[0])
+
+    def test_wsgi_response_stays_sync(self):
+        response = self.get_export()
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 20)
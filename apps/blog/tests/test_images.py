@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.accounts import backends
+from apps.accounts.models import UserProfile
+from apps.blog import homepage, images, page_cache
+from apps.blog.models import Post
+
+
+class StoreVariantsTests(TestCase):
+    """Storing a variant map is a queryset update, so it must drop the caches itself"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='x')
+        self.post = Post.objects.create(title='Post', slug='post', content='Body', excerpt='Body',
+                                        author=self.author, status='published', featured_image='posts/photo.jpg')
+        self.variants = {'source': 'posts/photo.jpg', 'webp': [[800, 'posts/photo.w800.webp']],
+                         'jpeg': [[800, 'posts/photo.w800.jpg']]}
+
+    def test_post_variants_invalidate_pages(self):
+        scopes = [page_cache.SITE_SCOPE]
+        before = page_cache.get_generations(scopes)
+        homepage.get_aggregates()
+        self.assertEqual(images.store_variants(Post, self.post.pk, 'featured_image', 'featured_image_variants',
+                                               self.variants), 1)
+        self.assertNotEqual(page_cache.get_generations(scopes), before)
+        self.assertIsNone(cache.get(homepage.CACHE_KEY))
+
+    def test_replaced_image_is_not_stored(self):
+        self.variants['source'] = 'posts/older.jpg'
+        before = page_cache.get_generations([page_cache.SITE_SCOPE])
+        self.assertEqual(images.store_variants(Post, self.post.pk, 'featured_image', 'featured_image_variants',
+                                               self.variants), 0)
+        self.assertEqual(page_cache.get_generations([page_cache.SITE_SCOPE]), before)
+
+    def test_avatar_variants_drop_cached_user(self):
+        profile = UserProfile.objects.get(user=self.author)
+        UserProfile.objects.filter(pk=profile.pk).update(avatar='avatars/me.jpg')
+        backends.CachedModelBackend().get_user(self.author.pk)
+        self.assertIsNotNone(cache.get(backends.cache_key(self.author.pk)))
+        images.store_variants(UserProfile, profile.pk, 'avatar', 'avatar_variants', {'source': 'avatars/me.jpg'})
+        self.assertIsNone(cache.get(backends.cache_key(self.author.pk)))
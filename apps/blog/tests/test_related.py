@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from apps.blog import related
+from apps.blog.models import Post, RelatedPost
+
+
+class RelatedPostsOnSaveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='x')
+        self.posts = [
+            Post.objects.create(title=f'Django caching {n}', slug=f'django-caching-{n}', excerpt='Caching views',
+                                content=f'Django caching with sqlite and templates, part {n}',
+                                author=self.author, status='published')
+            for n in range(8)
+        ]
+        related.rebuild()
+
+    def test_save_recomputes_only_the_saved_post(self):
+        post = self.posts[0]
+        post.content += ' more about caching'
+        # Save, reindex (4), score the post (3), store its neighbours (4), mark them stale (1)
+        with self.assertNumQueries(13):
+            post.save()
+        neighbour_ids = set(RelatedPost.objects.filter(post=post).values_list('related_id', flat=True))
+        self.assertEqual(len(neighbour_ids), related.TOP_K)
+        self.assertEqual(set(Post.objects.filter(related_stale=True).values_list('id', flat=True)), neighbour_ids)
+
+    def test_refresh_stale_clears_the_marks(self):
+        self.posts[0].save()
+        stale = Post.objects.filter(related_stale=True).count()
+        self.assertEqual(related.refresh_stale(), stale)
+        self.assertFalse(Post.objects.filter(related_stale=True).exists())
+        self.assertEqual(related.refresh_stale(), 0)
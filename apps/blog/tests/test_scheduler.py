@@ -0,0 +1,45 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.blog import scheduler
+from apps.blog.models import Post
+
+
+class PublishDueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        author = User.objects.create_user('author', password='x')
+        self.posts = [
+            Post.objects.create(title=f'Post {n}', slug=f'post-{n}', content='Body', excerpt='Body', author=author,
+                                status='draft', scheduled_publish_at=self.now - timedelta(minutes=n + 1))
+            for n in range(3)
+        ]
+
+    def test_publishes_due_drafts_once(self):
+        # SELECT the due drafts, one UPDATE for all of them, read back the ones this run stamped
+        with mock.patch.object(scheduler.related, 'update_post'), self.assertNumQueries(3):
+            published = scheduler.publish_due(self.now)
+        self.assertEqual({post.pk for post in published}, {post.pk for post in self.posts})
+        self.assertEqual(scheduler.publish_due(self.now), [])
+
+    def test_only_reports_posts_this_call_published(self):
+        """A rival scheduler that publishes a post between our SELECT and UPDATEs gets the credit for it"""
+        rival = self.posts[0]
+        due_drafts = scheduler.due_drafts
+        calls = []
+
+        def rival_publishes_after_select(now):
+            calls.append(now)
+            if len(calls) == 2:
+                Post.objects.filter(pk=rival.pk).update(status='published', published_at=now)
+            return due_drafts(now)
+
+        with mock.patch.object(scheduler, 'due_drafts', side_effect=rival_publishes_after_select):
+            published = scheduler.publish_due(self.now)
+        self.assertEqual({post.pk for post in published}, {post.pk for post in self.posts[1:]})
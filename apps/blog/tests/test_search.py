@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.blog import search
+from apps.blog.models import Post
+
+
+class SearchPostCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user('author', password='x')
+        for n in range(3):
+            Post.objects.create(title=f'Django tips {n}', slug=f'django-{n}', content='Body', excerpt='Body',
+                                author=self.author, status='published')
+
+    def run_search(self, query):
+        return list(search.search_posts(Post.objects.all(), query))
+
+    def test_search_reads_post_total_from_cache(self):
+        self.run_search('django')
+        with CaptureQueriesContext(connection) as queries:
+            results = self.run_search('django')
+        self.assertEqual(len(results), 3)
+        counts = [query['sql'] for query in queries if query['sql'].startswith('SELECT COUNT(*)')]
+        self.assertEqual(counts, [])
+
+    def test_creating_and_deleting_posts_refreshes_the_total(self):
+        self.assertEqual(search.post_count(), 3)
+        post = Post.objects.create(title='Another', slug='another', content='Body', excerpt='Body', author=self.author)
+        self.assertEqual(search.post_count(), 4)
+        post.delete()
+        self.assertEqual(search.post_count(), 3)
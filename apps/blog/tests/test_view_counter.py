@@ -0,0 +1,55 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TransactionTestCase, override_settings
+
+from apps.blog import view_counter
+from apps.blog.models import Post
+
+
+class ViewCounterTests(TransactionTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        author = User.objects.create_user('author', password='x')
+        self.post = Post.objects.create(title='Post', slug='post', content='Body', excerpt='Body',
+                                        author=author, status='published')
+
+    def views(self):
+        return Post.objects.values_list('views_count', flat=True).get(pk=self.post.pk)
+
+    def test_drain_applies_appends_to_a_claimed_segment(self):
+        with override_settings(VIEW_COUNT_LOG_DIR=self.tmp.name):
+            for _ in range(3):
+                view_counter.record_view(self.post.pk)
+            apply_counts = view_counter.apply_counts
+
+            def late_writer(counts):
+                # A writer that opened views.log before the rename appends after the grace period
+                apply_counts(counts)
+                if late_writer.pending:
+                    late_writer.pending = False
+                    segment, = [name for name in os.listdir(self.tmp.name) if name.endswith(view_counter.CLAIMED_SUFFIX)]
+                    with open(os.path.join(self.tmp.name, segment), 'a') as log:
+                        log.write(f'{self.post.pk}\n' * 2)
+            late_writer.pending = True
+
+            with mock.patch.object(view_counter, 'apply_counts', late_writer):
+                self.assertEqual(view_counter.drain(grace=0), (5, 1))
+        self.assertEqual(self.views(), 5)
+
+    def test_unwritable_log_uses_a_single_fallback_worker(self):
+        blocker = os.path.join(self.tmp.name, 'not-a-directory')
+        open(blocker, 'w').close()
+        threads_before = threading.active_count()
+        with override_settings(VIEW_COUNT_LOG_DIR=os.path.join(blocker, 'views')), \
+                mock.patch.object(view_counter.logger, 'exception'):
+            for _ in range(50):
+                view_counter.record_view(self.post.pk)
+            self.assertLessEqual(threading.active_count(), threads_before + 1)
+            # Reading while the worker writes would trip SQLite's shared-cache table locks
+            view_counter._fallback_queue.join()
+        self.assertEqual(self.views(), 50)
@@ -0,0 +1,102 @@
+"""
+Threaded comment loading.
+
+Every comment stores its thread (top-level ancestor), depth and a
+materialized path of zero-padded ids, so sorting a thread by path walks its
+replies depth-first. A page of threads, each with its first few replies,
+is one indexed query: the newest N roots are picked by (post, depth, -id),
+and a ROW_NUMBER() window over (thread, path) caps how many replies come
+back per thread. Further replies are fetched lazily, after the last path
+the reader has seen, so memory and render time stay bounded however large
+a discussion grows.
+"""
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Comment
+
+THREADS_PER_PAGE = 10
+REPLIES_PER_THREAD = 5
+REPLIES_PER_BATCH = 20
+
+
+def _approved(post_id):
+    return Comment.objects.filter(post_id=post_id, is_approved=True)
+
+
+def _attach(comments, top_level=False):
+    """
+    Nest comments (in path order) under parents present in the list via
+    `.children` and return the rest, in order. Roots are always returned;
+    other replies only with top_level, since a missing parent inside a
+    thread page means it is unapproved and its subtree stays hidden.
+    """
+    nodes = {}
+    tops = []
+    for comment in comments:
+        comment.children = []
+        parent = nodes.get(comment.parent_id)
+        if parent is not None:
+            parent.children.append(comment)
+        elif comment.depth == 0 or top_level:
+            tops.append(comment)
+        else:
+            continue
+        nodes[comment.pk] = comment
+    return tops
+
+
+def thread_page(post_id, before=None, per_page=THREADS_PER_PAGE, replies=REPLIES_PER_THREAD):
+    """
+    Return (threads, next_before) for a page of top-level comments, newest
+    first, each carrying its first `replies` replies in `.children` and a
+    `has_more_replies` / `last_path` pair for lazy loading.
+    """
+    roots = _approved(post_id).filter(depth=0)
+    if before is not None:
+        roots = roots.filter(id__lt=before)
+    root_ids = roots.order_by('-id').values('id')[:per_page + 1]
+
+    rows = list(
+        _approved(post_id)
+        .filter(thread_id__in=root_ids)
+        .select_related('author')
+        .annotate(position=Window(RowNumber(), partition_by=[F('thread_id')], order_by=F('path').asc()))
+        # The root is position 1; one extra reply tells us whether more exist
+        .filter(position__lte=replies + 2)
+        .order_by('-thread_id', 'path')
+    )
+
+    threads = {}
+    for comment in rows:
+        threads.setdefault(comment.thread_id, []).append(comment)
+
+    page = []
+    for thread_id in sorted(threads, reverse=True)[:per_page]:
+        comments = threads[thread_id]
+        shown = comments[:replies + 1]
+        root = _attach(shown)[0]
+        root.has_more_replies = len(comments) > len(shown)
+        root.last_path = shown[-1].path
+        page.append(root)
+
+    next_before = page[-1].pk if len(threads) > per_page and page else None
+    return page, next_before
+
+
+def reply_batch(post_id, thread_id, after, limit=REPLIES_PER_BATCH):
+    """
+    Return (fragments, last_path, has_more) for the replies of a thread that
+    follow `after` in path order. Each fragment is (parent_id, comment) with
+    its nested replies from the same batch in `.children`.
+    """
+    rows = list(
+        _approved(post_id)
+        .filter(thread_id=thread_id, path__gt=after)
+        .select_related('author')
+        .order_by('path')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    fragments = [(comment.parent_id, comment) for comment in _attach(rows, top_level=True)]
+    return fragments, (rows[-1].path if rows else after), has_more
@@ -13,11 +13,15 @@ urlpatterns = [
     # API endpoints for reactions and comments
     path('api/reaction/', views.AddReactionView.as_view(), name='add-reaction'),
     path('api/comment/', views.AddCommentView.as_view(), name='add-comment'),
+    path('api/comments/<int:post_id>/', views.CommentThreadsView.as_view(), name='comment-threads'),
+    path('api/comments/<int:post_id>/replies/<int:thread_id>/', views.CommentRepliesView.as_view(), name='comment-replies'),
     path('api/newsletter/', views.NewsletterSubscribeView.as_view(), name='newsletter-subscribe'),
     
     # Admin dashboard
     path('admin/dashboard/', views.AdminDashboardView.as_view(), name='admin-dashboard'),
     path('admin/posts/', views.AdminPostListView.as_view(), name='admin-post-list'),
+    path('admin/export/<str:kind>/', views.AdminExportView.as_view(), name='admin-export'),
+    path('admin/performance/', views.AdminPerformanceView.as_view(), name='admin-performance'),
     path('admin/posts/create/', views.AdminPostCreateView.as_view(), name='admin-post-create'),
     path('admin/posts/<int:pk>/edit/', views.AdminPostUpdateView.as_view(), name='admin-post-edit'),
     path('admin/posts/<int:pk>/delete/', views.AdminPostDeleteView.as_view(), name='admin-post-delete'),
@@ -0,0 +1,218 @@
+"""
+Write-behind view counter for PostDetailView.
+
+Page hits append the post id to a shared log file instead of writing to the
+posts table. Every process on the box appends to the same file with O_APPEND,
+so small writes never interleave. `drain_view_counts` periodically claims the
+log by renaming it, aggregates the ids and applies them as a handful of
+batched `F('views_count') + n` updates, adding them to the daily view
+rollups (apps.blog.stats) in the same transaction.
+
+Loss guarantees:
+- A crashed web worker loses nothing: the append has reached the kernel
+  before the response is sent. Only a host crash can drop appends that were
+  not yet written back to disk.
+- A writer that opened the log just before the drainer renamed it still
+  appends to the claimed segment. The drainer waits a grace period, and
+  after applying the segment it re-reads anything appended since and
+  applies that too. Only an append landing between that final check and
+  the unlink is lost, which needs a writer stalled between open() and
+  write() for the whole drain.
+- If the log cannot be written, views go to a single background thread
+  per process that applies them in batches. Its queue is bounded, so views
+  beyond FALLBACK_QUEUE_SIZE are dropped (and logged) rather than
+  piling up threads or memory.
+- A drainer that crashes before committing leaves its claimed segment on
+  disk, and the next run applies it. A crash between commit and unlink
+  re-applies that one segment, so counts can run over by at most one
+  drain interval but are never lost.
+- Drainers take an exclusive lock on `drain.lock` in the log directory, so
+  overlapping runs (a slow cron job, several hosts sharing the directory)
+  apply each segment once; a second drainer waits for the first.
+"""
+import fcntl
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Post
+from . import stats
+
+logger = logging.getLogger(__name__)
+
+LOG_NAME = 'views.log'
+CLAIMED_SUFFIX = '.draining'
+LOCK_NAME = 'drain.lock'
+UPDATE_BATCH_SIZE = 500
+FALLBACK_QUEUE_SIZE = 10000
+
+_fallback_queue = queue.Queue(maxsize=FALLBACK_QUEUE_SIZE)
+_fallback_worker = None
+_fallback_lock = threading.Lock()
+
+
+def _log_dir():
+    return str(settings.VIEW_COUNT_LOG_DIR)
+
+
+def _append(path, data):
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def record_view(post_id):
+    """Buffer a single view of a post"""
+    path = os.path.join(_log_dir(), LOG_NAME)
+    data = f'{post_id}\n'.encode()
+    try:
+        try:
+            _append(path, data)
+        except FileNotFoundError:
+            os.makedirs(_log_dir(), exist_ok=True)
+            _append(path, data)
+    except OSError:
+        # The log is unusable; hand the view to the fallback worker rather than
+        # drop it, off the request thread (which may be running an event loop)
+        logger.exception('Could not buffer view for post %s', post_id)
+        _queue_fallback(post_id)
+
+
+def _queue_fallback(post_id):
+    global _fallback_worker
+    try:
+        _fallback_queue.put_nowait(post_id)
+    except queue.Full:
+        logger.error('View fallback queue is full; dropped a view of post %s', post_id)
+        return
+    with _fallback_lock:
+        if _fallback_worker is None:
+            _fallback_worker = threading.Thread(target=_apply_fallback, name='view-counter-fallback', daemon=True)
+            _fallback_worker.start()
+
+
+def _reset_fallback():
+    """A forked child has no worker thread; start it afresh on first use"""
+    global _fallback_queue, _fallback_worker
+    _fallback_queue = queue.Queue(maxsize=FALLBACK_QUEUE_SIZE)
+    _fallback_worker = None
+
+
+os.register_at_fork(after_in_child=_reset_fallback)
+
+
+def _apply_fallback():
+    """Apply queued views, batching whatever queued up during the previous write"""
+    while True:
+        counts = Counter([_fallback_queue.get()])
+        while True:
+            try:
+                counts[_fallback_queue.get_nowait()] += 1
+            except queue.Empty:
+                break
+        try:
+            apply_counts(counts)
+        except Exception:
+            logger.exception('Could not record views %s', dict(counts))
+        finally:
+            connection.close()
+            for _ in range(sum(counts.values())):
+                _fallback_queue.task_done()
+
+
+def _claim_segments():
+    """Rename the live log out of the way and return every unapplied segment"""
+    log_dir = _log_dir()
+    if not os.path.isdir(log_dir):
+        return [], False
+    live = os.path.join(log_dir, LOG_NAME)
+    claimed_new = False
+    try:
+        os.rename(live, os.path.join(log_dir, f'views.{time.time_ns()}{CLAIMED_SUFFIX}'))
+        claimed_new = True
+    except FileNotFoundError:
+        pass
+    segments = sorted(
+        os.path.join(log_dir, name)
+        for name in os.listdir(log_dir)
+        if name.endswith(CLAIMED_SUFFIX)
+    )
+    return segments, claimed_new
+
+
+def read_segment(path, offset=0):
+    """
+    Aggregate a log segment from offset on into a Counter of post id -> views.
+    Returns the counts and the offset after the last complete line.
+    """
+    counts = Counter()
+    with open(path, 'rb') as segment:
+        segment.seek(offset)
+        for line in segment:
+            if not line.endswith(b'\n'):
+                # Appends are single writes, so only a torn file ends mid-line
+                break
+            offset += len(line)
+            line = line.strip()
+            if line.isdigit():
+                counts[int(line)] += 1
+    return counts, offset
+
+
+def apply_counts(counts):
+    """Apply aggregated views as one UPDATE per distinct increment and roll them up"""
+    by_increment = defaultdict(list)
+    for post_id, views in counts.items():
+        by_increment[views].append(post_id)
+
+    with transaction.atomic():
+        for views, post_ids in by_increment.items():
+            for start in range(0, len(post_ids), UPDATE_BATCH_SIZE):
+                Post.objects.filter(
+                    pk__in=post_ids[start:start + UPDATE_BATCH_SIZE]
+                ).update(views_count=F('views_count') + views)
+        stats.record_views(counts)
+
+
+def drain(grace=0.5):
+    """
+    Flush buffered views to the database.
+
+    Returns a (views, posts) tuple with the number of views applied and the
+    number of distinct posts they touched.
+    """
+    if not os.path.isdir(_log_dir()):
+        return 0, 0
+    lock = os.open(os.path.join(_log_dir(), LOCK_NAME), os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        segments, claimed_new = _claim_segments()
+        if claimed_new:
+            # Let writers that opened the log just before the rename finish
+            time.sleep(grace)
+
+        total = Counter()
+        for path in segments:
+            offset = 0
+            while True:
+                # Re-read until nothing new arrived, for late writers to the claimed segment
+                counts, end = read_segment(path, offset)
+                if end == offset:
+                    break
+                if counts:
+                    apply_counts(counts)
+                total.update(counts)
+                offset = end
+            os.remove(path)
+    finally:
+        os.close(lock)
+    return sum(total.values()), len(total)
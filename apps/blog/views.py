@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, View
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Q, Count
-from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
 from django.utils import timezone
 from django.urls import reverse_lazy
 from django.core.paginator import Paginator
@@ -10,12 +14,33 @@ from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 
 from .models import Post, Comment, Reaction, Category, Newsletter
+from .counters import set_reaction
 from .forms import PostForm, CommentForm
+from .mixins import AsyncLoginRequiredMixin, ConditionalGetMixin, PageCacheMixin, aget_user
+from .pagination import KeysetPaginationMixin
+from . import export, homepage, instrumentation, page_cache, stats
+from .related import related_posts
+from .search import search_posts
+from .threads import reply_batch, thread_page
+from .view_counter import record_view
 import json
 
+from asgiref.sync import sync_to_async
 
-class PostListView(ListView):
+# Search results page by relevance, ties broken by newest post
+SEARCH_ORDERING = ('-search_rank', '-id')
+
+
+async def aget_object_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+class PostListView(ConditionalGetMixin, PageCacheMixin, KeysetPaginationMixin, ListView):
     """Display list of published posts with filtering and pagination"""
+    read_from_replica = True
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
@@ -27,10 +52,7 @@ class PostListView(ListView):
             is_visible=True
         ).select_related(
             'author', 'category'
-        ).annotate(
-            comment_count=Count('comments', filter=Q(comments__is_approved=True)),
-            reaction_count=Count('reactions')
-        ).order_by('-published_at')
+        ).defer('content').order_by('-published_at')
 
         # Filter by category
         category_id = self.request.GET.get('category')
@@ -40,28 +62,32 @@ class PostListView(ListView):
         # Filter by search
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(excerpt__icontains=search) |
-                Q(content__icontains=search)
-            )
+            queryset = search_posts(queryset, search)
 
         return queryset
 
+    def get_keyset_ordering(self):
+        if self.request.GET.get('search'):
+            return SEARCH_ORDERING
+        return self.keyset_ordering
+
+    async def get(self, request, *args, **kwargs):
+        # search_posts() looks up term frequencies while building the queryset
+        self.object_list = await sync_to_async(self.get_queryset)()
+        await self.aprefetch_page()
+        # featured_posts, categories and total_posts, cached as one object
+        self.aggregates = await sync_to_async(homepage.get_aggregates)()
+        return self.render_to_response(self.get_context_data())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['featured_posts'] = Post.objects.filter(
-            status='published', featured=True, is_visible=True
-        ).select_related('author', 'category')[:3]
-        context['categories'] = Category.objects.annotate(
-            post_count=Count('posts', filter=Q(posts__status='published', posts__is_visible=True))
-        ).filter(post_count__gt=0)
-        context['total_posts'] = Post.objects.filter(status='published', is_visible=True).count()
+        context.update(self.aggregates)
         return context
 
 
-class PostDetailView(DetailView):
+class PostDetailView(ConditionalGetMixin, PageCacheMixin, DetailView):
     """Display single post with comments and reactions"""
+    read_from_replica = True
     model = Post
     template_name = 'blog/post_detail.html'
     slug_field = 'slug'
@@ -70,18 +96,77 @@ class PostDetailView(DetailView):
     def get_queryset(self):
         return Post.objects.filter(status='published', is_visible=True).select_related('author', 'category')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        post = self.object
+    def get_post_state(self):
+        """The few columns that decide whether a cached or revalidated page is current"""
+        if not hasattr(self, '_post_state'):
+            self._post_state = self.get_queryset().filter(slug=self.kwargs['slug']).values(
+                'pk', 'category_id', 'updated_at', 'comment_count', 'reaction_count'
+            ).first()
+        return self._post_state
+
+    def get_page_cache_scopes(self):
+        state = self.get_post_state()
+        if state is None:
+            return None
+        return [page_cache.category_scope(state['category_id'])]
+
+    def get_page_cache_meta(self):
+        return {'post_id': self.get_post_state()['pk']}
+
+    def page_cache_hit(self, meta):
+        record_view(meta['post_id'])
+
+    def get_conditional_validators(self):
+        state = self.get_post_state()
+        if state is None:
+            return None
+        scopes = self.get_page_cache_scopes()
+        parts = [state['pk'], state['updated_at'].isoformat(), state['comment_count'], state['reaction_count']]
+        parts += page_cache.get_generations(scopes)
+        # Comments and related posts change the page without touching the post row
+        changed = page_cache.last_changed(scopes)
+        last_modified = max(state['updated_at'].timestamp(), changed) if changed else None
+        return parts, last_modified
+
+    def conditional_hit(self):
+        record_view(self.get_post_state()['pk'])
+
+    async def get(self, request, *args, **kwargs):
+        post = await self.get_queryset().filter(slug=self.kwargs['slug']).afirst()
+        if post is None:
+            raise Http404('No post found matching the query')
+        self.object = post
+        user = await aget_user(request)
+
+        # Buffer the view; drain_view_counts applies it in a batch
+        await sync_to_async(record_view)(post.pk)
+
+        context = {}
+        # First page of comment threads with their first replies, in one query
+        context['comment_threads'], context['comments_next'] = await sync_to_async(thread_page)(post.pk)
+
+        # Get user's reaction if logged in
+        if user.is_authenticated:
+            context['user_reaction'] = await (
+                post.reactions.filter(user=user).values_list('reaction_type', flat=True).afirst()
+            )
 
-        # Increment view count
-        post.views_count += 1
-        post.save(update_fields=['views_count'])
+        # Related posts from the similarity index, falling back to the same category
+        related = [related async for related in related_posts(post).select_related('author').defer('content')]
+        if not related:
+            related = [
+                related async for related in Post.objects.filter(
+                    category_id=post.category_id,
+                    status='published',
+                    is_visible=True
+                ).exclude(id=post.id).select_related('author').defer('content')[:3]
+            ]
+        context['related_posts'] = related
 
-        # Get approved comments
-        context['comments'] = post.comments.filter(
-            is_approved=True
-        ).select_related('author').order_by('-created_at')
+        return self.render_to_response(self.get_context_data(object=post, **context))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
 
         # Prepare reactions data for template
         reactions_data = [
@@ -93,38 +178,34 @@ class PostDetailView(DetailView):
         ]
         context['reactions'] = reactions_data
 
-        # Get user's reaction if logged in
-        if self.request.user.is_authenticated:
-            user_reaction = post.reactions.filter(user=self.request.user).first()
-            context['user_reaction'] = user_reaction.reaction_type if user_reaction else None
-
-        # Related posts
-        context['related_posts'] = Post.objects.filter(
-            category=post.category,
-            status='published',
-            is_visible=True
-        ).exclude(id=post.id).select_related('author')[:3]
-
         # Comment form
         context['comment_form'] = CommentForm()
 
         return context
 
 
-class CategoryPostsView(ListView):
+class CategoryPostsView(ConditionalGetMixin, PageCacheMixin, KeysetPaginationMixin, ListView):
     """Display posts from specific category"""
+    read_from_replica = True
     model = Post
     template_name = 'blog/category_posts.html'
     context_object_name = 'posts'
     paginate_by = 12
 
+    def get_page_cache_scopes(self):
+        if not hasattr(self, '_category_id'):
+            self._category_id = Category.objects.filter(slug=self.kwargs['slug']).values_list('pk', flat=True).first()
+        if self._category_id is None:
+            return None
+        return [page_cache.category_scope(self._category_id)]
+
     def get_queryset(self):
         self.category = get_object_or_404(Category, slug=self.kwargs['slug'])
         return Post.objects.filter(
             category=self.category,
             status='published',
             is_visible=True
-        ).select_related('author').order_by('-published_at')
+        ).select_related('author').defer('content').order_by('-published_at')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -133,8 +214,9 @@ class CategoryPostsView(ListView):
         return context
 
 
-class SearchPostsView(ListView):
+class SearchPostsView(KeysetPaginationMixin, ListView):
     """Search posts"""
+    read_from_replica = True
     model = Post
     template_name = 'blog/search_results.html'
     context_object_name = 'posts'
@@ -142,13 +224,23 @@ class SearchPostsView(ListView):
 
     def get_queryset(self):
         query = self.request.GET.get('q', '')
-        return Post.objects.filter(
-            Q(title__icontains=query) |
-            Q(excerpt__icontains=query) |
-            Q(content__icontains=query),
+        queryset = Post.objects.filter(
             status='published',
             is_visible=True
-        ).select_related('author', 'category').order_by('-published_at')
+        ).select_related('author', 'category').defer('content').order_by('-published_at')
+        if query:
+            queryset = search_posts(queryset, query)
+        return queryset
+
+    def get_keyset_ordering(self):
+        if self.request.GET.get('q'):
+            return SEARCH_ORDERING
+        return self.keyset_ordering
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await sync_to_async(self.get_queryset)()
+        await self.aprefetch_page()
+        return self.render_to_response(self.get_context_data())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -156,59 +248,97 @@ class SearchPostsView(ListView):
         return context
 
 
-class AddReactionView(LoginRequiredMixin, View):
+class CommentThreadsView(View):
+    """Next page of top-level comment threads, rendered as HTML"""
+    read_from_replica = True
+
+    def get(self, request, post_id):
+        post = get_object_or_404(Post.objects.filter(status='published', is_visible=True).only('id'), pk=post_id)
+        try:
+            before = int(request.GET['before']) if request.GET.get('before') else None
+        except ValueError:
+            raise Http404('Invalid cursor')
+
+        threads, next_before = thread_page(post.pk, before=before)
+        html = render_to_string('blog/partials/comment_threads.html', {'comment_threads': threads}, request=request)
+        return JsonResponse({'success': True, 'html': html, 'next_before': next_before})
+
+
+class CommentRepliesView(View):
+    """Further replies of one thread, after the last path the client has"""
+    read_from_replica = True
+
+    def get(self, request, post_id, thread_id):
+        post = get_object_or_404(Post.objects.filter(status='published', is_visible=True).only('id'), pk=post_id)
+        after = request.GET.get('after', '')
+
+        fragments, last_path, has_more = reply_batch(post.pk, thread_id, after)
+        return JsonResponse({
+            'success': True,
+            'fragments': [
+                {
+                    'parent_id': parent_id,
+                    'html': render_to_string('blog/partials/comment.html', {'comment': comment}, request=request),
+                }
+                for parent_id, comment in fragments
+            ],
+            'after': last_path,
+            'has_more': has_more,
+        })
+
+
+class AddReactionView(AsyncLoginRequiredMixin, View):
     """Add or update user reaction to post"""
-    def post(self, request):
+    async def post(self, request):
         try:
             data = json.loads(request.body)
-            post_id = data.get('post_id')
+            post_id = int(data.get('post_id'))
             reaction_type = data.get('reaction_type')
 
-            post = get_object_or_404(Post, id=post_id)
+            if reaction_type not in dict(Reaction.REACTION_CHOICES):
+                return JsonResponse({'success': False, 'error': 'Invalid reaction type'}, status=400)
 
-            # Try to get existing reaction
-            reaction, created = Reaction.objects.get_or_create(
-                post=post,
-                user=request.user,
-                defaults={'reaction_type': reaction_type}
-            )
-
-            if not created:
-                # Update existing reaction
-                reaction.reaction_type = reaction_type
-                reaction.save()
-
-            # Get updated reaction counts
-            reactions_count = post.reactions.values('reaction_type').annotate(
-                count=Count('id')
-            ).order_by('reaction_type')
+            # One upsert plus incremental histogram updates; no re-aggregation
+            try:
+                # A transaction with signal-maintained counters; runs in a worker thread
+                reactions_count = await sync_to_async(set_reaction)(post_id, request.user, reaction_type)
+            except IntegrityError:
+                return JsonResponse({'success': False, 'error': 'Post not found'}, status=404)
+            await sync_to_async(page_cache.invalidate_posts)([post_id])
 
             return JsonResponse({
                 'success': True,
-                'reactions': list(reactions_count),
+                'reactions': reactions_count,
                 'user_reaction': reaction_type
             })
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
-class AddCommentView(LoginRequiredMixin, View):
+class AddCommentView(AsyncLoginRequiredMixin, View):
     """Add comment to post"""
-    def post(self, request):
+    async def post(self, request):
         try:
             form = CommentForm(request.POST)
             if form.is_valid():
                 post_id = request.POST.get('post_id')
-                post = get_object_or_404(Post, id=post_id)
+                post = await aget_object_or_404(Post.objects.all(), id=post_id)
 
                 comment = form.save(commit=False)
                 comment.post = post
                 comment.author = request.user
-                comment.save()
+                parent_id = request.POST.get('parent_id')
+                if parent_id:
+                    comment.parent = await aget_object_or_404(
+                        Comment.objects.filter(post=post, is_approved=True), id=parent_id
+                    )
+                await sync_to_async(self.save_comment)(comment)
 
                 return JsonResponse({
                     'success': True,
                     'comment': {
+                        'id': comment.id,
+                        'parent_id': comment.parent_id,
                         'author': comment.author.get_full_name() or comment.author.username,
                         'content': comment.content,
                         'created_at': comment.created_at.strftime('%B %d, %Y at %I:%M %p')
@@ -222,10 +352,15 @@ class AddCommentView(LoginRequiredMixin, View):
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+    def save_comment(self, comment):
+        # Counters, the thread path and page invalidation run in signal handlers
+        with transaction.atomic():
+            comment.save()
+
 
 class NewsletterSubscribeView(View):
     """Subscribe to newsletter"""
-    def post(self, request):
+    async def post(self, request):
         try:
             data = json.loads(request.body)
             email = data.get('email')
@@ -233,14 +368,14 @@ class NewsletterSubscribeView(View):
             if not email:
                 return JsonResponse({'success': False, 'error': 'Email is required'}, status=400)
 
-            newsletter, created = Newsletter.objects.get_or_create(
+            newsletter, created = await Newsletter.objects.aget_or_create(
                 email=email,
                 defaults={'is_active': True}
             )
 
             if not created and not newsletter.is_active:
                 newsletter.is_active = True
-                newsletter.save()
+                await newsletter.asave()
 
             return JsonResponse({
                 'success': True,
@@ -258,30 +393,74 @@ class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 
 
 class AdminDashboardView(AdminRequiredMixin, TemplateView):
-    """Admin dashboard"""
+    """Admin dashboard; totals and charts come from the rollups kept by rollup_stats"""
     template_name = 'blog/admin/dashboard.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_posts'] = Post.objects.count()
-        context['published_posts'] = Post.objects.filter(status='published').count()
-        context['draft_posts'] = Post.objects.filter(status='draft').count()
-        context['total_comments'] = Comment.objects.filter(is_approved=True).count()
-        context['total_reactions'] = Reaction.objects.count()
-        context['recent_posts'] = Post.objects.select_related('author', 'category').order_by('-created_at')[:5]
-        context['recent_comments'] = Comment.objects.select_related('author', 'post').order_by('-created_at')[:5]
+        days = settings.STATS_DASHBOARD_DAYS
+        context.update(stats.latest_totals())
+        context['stats_days'] = days
+        context['stats_series'] = stats.series(days)
+        context['top_posts'], context['top_categories'] = stats.top_viewed(days)
+        context['reaction_breakdown'] = stats.reactions_by_type(days)
+        context['recent_posts'] = Post.objects.select_related('author', 'category').defer('content').order_by('-created_at')[:5]
+        if page_cache.is_enabled():
+            context['page_cache_stats'] = page_cache.get_stats()
+        context['recent_comments'] = Comment.objects.select_related('author', 'post').defer('post__content').order_by('-created_at')[:5]
+        context['export_kinds'] = list(export.EXPORTS)
         return context
 
 
-class AdminPostListView(AdminRequiredMixin, ListView):
+class AdminExportView(AdminRequiredMixin, View):
+    """Stream posts, comments or reactions as NDJSON or CSV"""
+    def get(self, request, kind):
+        export_format = request.GET.get('format', 'ndjson')
+        if kind not in export.EXPORTS or export_format not in export.FORMATS:
+            raise Http404('Unknown export')
+
+        # An ASGI response must get an async iterator, or Django buffers the whole export first
+        blocks = export.astream if settings.RUNNING_ASGI else export.stream
+        response = StreamingHttpResponse(blocks(kind, export_format), content_type=export.CONTENT_TYPES[export_format])
+        filename = f'{kind}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class AdminPerformanceView(AdminRequiredMixin, TemplateView):
+    """Slowest endpoints among the requests sampled by RequestMetricsMiddleware"""
+    template_name = 'blog/admin/performance.html'
+    orderings = {'total_ms': 'Avg time', 'sql_ms': 'Avg SQL time', 'queries': 'Avg queries', 'requests': 'Requests'}
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        order = self.request.GET.get('order', 'total_ms')
+        if order not in self.orderings:
+            order = 'total_ms'
+        context['order'] = order
+        context['orderings'] = self.orderings
+        context['endpoints'] = instrumentation.worst_endpoints(order)
+        context['sample_rate'] = settings.REQUEST_METRICS_SAMPLE_RATE
+        context['metrics_enabled'] = settings.REQUEST_METRICS_ENABLED
+        return context
+
+    def post(self, request):
+        instrumentation.reset()
+        messages.success(request, 'Request metrics cleared.')
+        return redirect('blog:admin-performance')
+
+
+class AdminPostListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     """Admin post list"""
     model = Post
     template_name = 'blog/admin/post_list.html'
     context_object_name = 'posts'
     paginate_by = 20
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        return Post.objects.select_related('author', 'category').order_by('-created_at')
+        return Post.objects.select_related('author', 'category').defer('content').order_by('-created_at')
 
 
 class AdminPostCreateView(AdminRequiredMixin, CreateView):
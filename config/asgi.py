@@ -0,0 +1,18 @@
+"""
+ASGI config for modern-blog-site project.
+
+Serve with uvicorn workers, e.g.
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+See "Running under ASGI" in CONFIGURATION.md for which views and
+middleware run on the event loop.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Read by settings to turn off persistent database connections
+os.environ.setdefault('DJANGO_SERVER_INTERFACE', 'asgi')
+
+application = get_asgi_application()
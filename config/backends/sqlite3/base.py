@@ -0,0 +1,47 @@
+"""
+SQLite backend tuned for serving concurrent requests.
+
+Adds two OPTIONS to Django's SQLite backend:
+
+- `pragmas`: name -> value pairs applied to every new connection, e.g.
+  journal_mode=WAL so readers never block on a writer (and vice versa),
+  synchronous=NORMAL (durable in WAL mode except on power loss), a
+  busy_timeout so a second writer waits instead of failing with "database
+  is locked", and mmap_size/cache_size for the page cache.
+- `transaction_mode`: "IMMEDIATE" starts atomic blocks with BEGIN IMMEDIATE.
+  A deferred transaction that reads and then writes cannot wait for the
+  write lock once another writer has committed; it fails at once, whatever
+  the busy_timeout. Taking the lock up front makes writers queue instead.
+
+Long-lived connections (CONN_MAX_AGE) run PRAGMA optimize when closed.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # Our options are not sqlite3.connect() arguments
+        self.pragmas = dict(kwargs.pop('pragmas', {}))
+        self.transaction_mode = kwargs.pop('transaction_mode', '').upper()
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode in ('IMMEDIATE', 'EXCLUSIVE'):
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
+
+    def _close(self):
+        if self.connection is not None and not self.is_in_memory_db():
+            try:
+                self.connection.execute('PRAGMA optimize')
+            except self.Database.Error:
+                pass
+        super()._close()
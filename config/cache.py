@@ -0,0 +1,365 @@
+"""
+Two-tier cache backend: a small in-process LRU in front of a SQLite file
+shared by every worker process on the machine.
+
+- Shared tier: one SQLite database (LOCATION) in WAL mode. Every process
+  sees the same entries, so a value computed by one gunicorn worker is a
+  hit in all the others, and deleting or bumping a key is visible to all.
+- Local tier: the LOCAL_MAX_ENTRIES most recently read entries, kept as
+  pickles in process memory for at most LOCAL_TIMEOUT seconds. A hit costs
+  no file read.
+- Invalidation broadcast: every write appends the key to an `invalidations`
+  log with an increasing sequence number. Before serving a local hit (or at
+  most every SYNC_INTERVAL seconds, if set) a process checks
+  `PRAGMA data_version`, which changes only when another connection has
+  committed, and if something changed drops the local copies of the keys
+  logged after the last sequence it has seen. A process that fell behind the
+  pruned log drops its whole local tier.
+- Stampede protection in `get_or_set()`: on a miss, one thread per process
+  and one process per key (a lease row in the shared tier) computes the
+  value while the others wait for it. Entries also remember how long they
+  took to compute, and a reader may recompute shortly before expiry with a
+  probability that grows as expiry nears ("XFetch"), so a hot key is
+  refreshed by a single caller before it runs out instead of by all of them
+  after. The computed value is only stored if the key was not invalidated
+  while it was being computed, so a concurrent edit is never overwritten
+  by the stale value.
+"""
+import math
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# An invalidation of this key empties every local tier
+CLEAR_ALL = '*'
+# Invalidation log entries kept for processes catching up
+LOG_LENGTH = 10000
+# Fraction of writes that also prune the shared tier and the log
+MAINTENANCE_PROBABILITY = 0.01
+FLIGHT_LOCKS = 64
+
+Entry = namedtuple('Entry', 'value expires delta')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    delta REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS invalidations (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+"""
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.sync_interval = options.get('SYNC_INTERVAL', 0)
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.early_recompute_beta = options.get('EARLY_RECOMPUTE_BETA', 1.0)
+        self.busy_timeout = options.get('BUSY_TIMEOUT', 5000)
+
+        self._thread = threading.local()
+        self._local = OrderedDict()  # key -> (pickled value, expires, delta, local deadline)
+        self._local_lock = threading.Lock()
+        self._flight_locks = [threading.Lock() for _ in range(FLIGHT_LOCKS)]
+        self._last_seq = None
+        self._last_sync = 0.0
+
+    # Shared tier
+
+    def _connection(self):
+        """This thread's connection; reopened after a fork (gunicorn --preload)"""
+        conn = getattr(self._thread, 'conn', None)
+        if conn is not None and self._thread.pid == os.getpid():
+            return conn
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout)}')
+        conn.executescript(SCHEMA)
+        self._thread.conn = conn
+        self._thread.pid = os.getpid()
+        self._thread.data_version = None
+        with self._local_lock:
+            if self._last_seq is None:
+                # Nothing is cached locally yet, so earlier invalidations are irrelevant
+                self._last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM invalidations').fetchone()[0]
+        return conn
+
+    def _write(self, keys, statements, unless=None):
+        """
+        Run (sql, params) statements in one write transaction and broadcast `keys`.
+        If the `unless` (sql, params) query returns a row, write nothing and return None.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if unless is not None and conn.execute(*unless).fetchone() is not None:
+                conn.execute('ROLLBACK')
+                return None
+            results = [conn.execute(sql, params).rowcount for sql, params in statements]
+            conn.executemany('INSERT INTO invalidations (key) VALUES (?)', [(key,) for key in keys])
+            if random.random() < MAINTENANCE_PROBABILITY:
+                self._maintain(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._evict_local(keys)
+        return results
+
+    def _maintain(self, conn):
+        """Drop expired entries, cull past MAX_ENTRIES and trim the invalidation log"""
+        now = time.time()
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        conn.execute('DELETE FROM leases WHERE expires <= ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # Entries closest to expiry go first; those without a timeout last
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (max(count - self._max_entries, count // self._cull_frequency),),
+            )
+        conn.execute('DELETE FROM invalidations WHERE seq <= (SELECT MAX(seq) FROM invalidations) - ?', (LOG_LENGTH,))
+
+    def _fetch(self, key):
+        row = self._connection().execute('SELECT value, expires, delta FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return Entry(*row)
+
+    # Local tier
+
+    def _sync(self):
+        """Drop local entries that another process has overwritten or deleted"""
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        conn = self._connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._thread.data_version:
+            return
+        self._thread.data_version = data_version
+        with self._local_lock:
+            since = self._last_seq
+        rows = conn.execute('SELECT seq, key FROM invalidations WHERE seq > ? ORDER BY seq', (since,)).fetchall()
+        if not rows:
+            return
+        oldest = conn.execute('SELECT MIN(seq) FROM invalidations').fetchone()[0]
+        with self._local_lock:
+            if oldest > since + 1 or any(key == CLEAR_ALL for _, key in rows):
+                self._local.clear()
+            else:
+                for _, key in rows:
+                    self._local.pop(key, None)
+            self._last_seq = max(self._last_seq, rows[-1][0])
+
+    def _evict_local(self, keys):
+        with self._local_lock:
+            if CLEAR_ALL in keys:
+                self._local.clear()
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _load(self, key):
+        """The live entry for an already validated key, from the local tier if possible"""
+        self._sync()
+        now = time.time()
+        with self._local_lock:
+            cached = self._local.get(key)
+            if cached is not None:
+                value, expires, delta, deadline = cached
+                if deadline > now and (expires is None or expires > now):
+                    self._local.move_to_end(key)
+                    return Entry(value, expires, delta)
+                del self._local[key]
+        entry = self._fetch(key)
+        if entry is not None:
+            deadline = now + self.local_timeout
+            with self._local_lock:
+                self._local[key] = (*entry, deadline)
+                self._local.move_to_end(key)
+                while len(self._local) > self.local_max_entries:
+                    self._local.popitem(last=False)
+        return entry
+
+    # Cache API
+
+    def _dump(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        entry = self._load(key)
+        return default if entry is None else pickle.loads(entry.value)
+
+    def _log_position(self):
+        return self._connection().execute('SELECT COALESCE(MAX(seq), 0) FROM invalidations').fetchone()[0]
+
+    def _invalidated_since(self, key, seq):
+        """A query returning a row if key was written or deleted after log position seq (or the log was pruned past it)"""
+        return (
+            'SELECT 1 FROM invalidations WHERE seq > ? AND key IN (?, ?) '
+            'UNION ALL SELECT 1 WHERE (SELECT MIN(seq) FROM invalidations) > ? + 1',
+            (seq, key, CLEAR_ALL, seq),
+        )
+
+    def _store(self, key, value, timeout, delta=0.0, since=None):
+        """Store an entry; with `since`, only if nothing touched the key after that log position"""
+        expires = self.get_backend_timeout(timeout)
+        unless = None if since is None else self._invalidated_since(key, since)
+        if expires is not None and expires <= time.time():
+            self._write([key], [('DELETE FROM cache WHERE key = ?', (key,))], unless)
+            return
+        self._write([key], [(
+            'INSERT OR REPLACE INTO cache (key, value, expires, delta) VALUES (?, ?, ?, ?)',
+            (key, self._dump(value), expires, delta),
+        )], unless)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._store(key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        # Replaces the row only if it has expired
+        [added] = self._write([key], [(
+            'INSERT INTO cache (key, value, expires, delta) VALUES (?, ?, ?, 0) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, delta = 0 '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, self._dump(value), expires, time.time()),
+        )])
+        return added == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        [touched] = self._write([key], [(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )])
+        return touched == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        [deleted] = self._write([key], [('DELETE FROM cache WHERE key = ?', (key,))])
+        return deleted == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                               (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            conn.execute('UPDATE cache SET value = ? WHERE key = ?', (self._dump(value), key))
+            conn.execute('INSERT INTO invalidations (key) VALUES (?)', (key,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._evict_local([key])
+        return value
+
+    def clear(self):
+        self._write([CLEAR_ALL], [('DELETE FROM cache', ()), ('DELETE FROM leases', ())])
+
+    def close(self, **kwargs):
+        # Connections are per thread and kept across requests
+        pass
+
+    # Single flight
+
+    def _recompute_early(self, entry):
+        """XFetch: recompute before expiry with a probability that grows as expiry nears"""
+        if entry.expires is None or not entry.delta:
+            return False
+        return time.time() - entry.delta * self.early_recompute_beta * math.log(1 - random.random()) >= entry.expires
+
+    def _acquire_lease(self, key):
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO leases (key, expires) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET expires = excluded.expires WHERE leases.expires <= ?',
+            (key, now + self.lock_timeout, now),
+        )
+        return cursor.rowcount == 1
+
+    def _release_lease(self, key):
+        self._connection().execute('DELETE FROM leases WHERE key = ?', (key,))
+
+    def _wait_for(self, key):
+        """Wait for the lease holder to store the key; None if it gives up or times out"""
+        deadline = time.monotonic() + self.lock_timeout
+        pause = 0.005
+        while time.monotonic() < deadline:
+            time.sleep(pause)
+            pause = min(pause * 2, 0.1)
+            entry = self._fetch(key)
+            if entry is not None:
+                return entry
+            held = self._connection().execute('SELECT 1 FROM leases WHERE key = ? AND expires > ?',
+                                              (key, time.time())).fetchone()
+            if held is None:
+                return self._fetch(key)
+        return None
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        entry = self._load(key)
+        if entry is not None and not self._recompute_early(entry):
+            return pickle.loads(entry.value)
+
+        flight_lock = self._flight_locks[hash(key) % FLIGHT_LOCKS]
+        # While another thread recomputes, serve the current value if there is one
+        if not flight_lock.acquire(blocking=entry is None):
+            return pickle.loads(entry.value)
+        try:
+            fresh = self._load(key)
+            if fresh is not None and (entry is None or fresh.expires != entry.expires):
+                return pickle.loads(fresh.value)
+            if not self._acquire_lease(key):
+                # Another process is computing it
+                if fresh is not None:
+                    return pickle.loads(fresh.value)
+                waited = self._wait_for(key)
+                if waited is not None:
+                    return pickle.loads(waited.value)
+            try:
+                # An invalidation after this point means the value may be computed from old data
+                since = self._log_position()
+                started = time.monotonic()
+                value = default() if callable(default) else default
+                if value is not None:
+                    self._store(key, value, timeout, time.monotonic() - started, since)
+            finally:
+                self._release_lease(key)
+            return value
+        finally:
+            flight_lock.release()
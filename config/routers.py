@@ -0,0 +1,58 @@
+"""
+Read/write splitting between the primary database and a read replica.
+
+Writes always go to `default`. Reads go to the `replica` alias only while a
+request is being handled by a view that opts in with
+`read_from_replica = True` (see apps.blog.middleware.ReplicaRoutingMiddleware),
+and only for GET/HEAD requests from clients that are not pinned to the
+primary. A client that has just written something (any successful unsafe
+request) is pinned for REPLICA_STICKY_SECONDS so it reads its own writes
+despite replication lag. Everything else, including management commands,
+workers and the admin, reads from the primary.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+# Sessions and users must be current to authenticate a request
+PRIMARY_ONLY_APPS = {'sessions', 'auth'}
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+@contextmanager
+def reading_from_replica(enabled=True):
+    """Route ORM reads inside the block to the replica"""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def route_reads_to_replica():
+    """Send ORM reads to the replica for the rest of the current context (request)"""
+    _use_replica.set(True)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return PRIMARY
+        # Reads inside a write transaction must see that transaction's writes
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, schema included
+        return db == PRIMARY
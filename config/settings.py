@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -39,7 +43,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'apps.blog.middleware.StaticFilesMiddleware',  # WhiteNoise with an async path
+    'apps.blog.middleware.RequestMetricsMiddleware',
+    'apps.blog.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,13 +76,57 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
+# SQLITE_TUNED switches to config.backends.sqlite3: WAL, tuned pragmas,
+# BEGIN IMMEDIATE transactions and persistent connections (see CONFIGURATION.md)
+SQLITE_TUNED = config('SQLITE_TUNED', default=not DEBUG, cast=bool)
+SQLITE_TUNED_OPTIONS = {
+    'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+        'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+        'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+        # Negative values are KiB: 64 MB of page cache per connection
+        'cache_size': config('SQLITE_CACHE_SIZE', default=-64000, cast=int),
+        'temp_store': 'MEMORY',
+    },
+}
+# config/asgi.py sets DJANGO_SERVER_INTERFACE=asgi. Persistent connections are
+# per thread, and under ASGI every request gets its own sync thread, so
+# connections would be left open; Django's docs say to disable them there.
+RUNNING_ASGI = config('DJANGO_SERVER_INTERFACE', default='wsgi') == 'asgi'
+DATABASE_CONN_MAX_AGE = 0 if RUNNING_ASGI else config('DATABASE_CONN_MAX_AGE', default=600 if SQLITE_TUNED else 0, cast=int)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'ENGINE': 'config.backends.sqlite3' if SQLITE_TUNED else 'django.db.backends.sqlite3',
+        'NAME': config('DATABASE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': SQLITE_TUNED,
+        'OPTIONS': SQLITE_TUNED_OPTIONS if SQLITE_TUNED else {},
     }
 }
 
+# Optional read replica (see config/routers.py): a copy of the primary kept
+# current by `manage.py sync_replica --loop` or an external replication tool
+DATABASE_REPLICA_PATH = config('DATABASE_REPLICA_PATH', default='')
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+if DATABASE_REPLICA_PATH:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': DATABASE_REPLICA_PATH,
+        'OPTIONS': {
+            **SQLITE_TUNED_OPTIONS,
+            'pragmas': {**SQLITE_TUNED_OPTIONS['pragmas'], 'query_only': 'ON'},
+        } if SQLITE_TUNED else {},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+
+# Sessions and request.user come from the cache (see apps/accounts/backends.py)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['apps.accounts.backends.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -142,12 +192,28 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {process:d} {thread:d} {message}',
             'style': '{',
         },
+        'structured': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'request_metrics': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
+    },
+    'loggers': {
+        # One JSON object per slow or query-heavy request
+        'apps.blog.instrumentation': {
+            'handlers': ['request_metrics'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -155,10 +221,70 @@ LOGGING = {
     },
 }
 
-# Cache configuration for better performance
+# Request instrumentation (see apps/blog/instrumentation.py)
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=1.0 if DEBUG else 0.05, cast=float)
+REQUEST_METRICS_SLOW_MS = config('REQUEST_METRICS_SLOW_MS', default=500, cast=float)
+REQUEST_METRICS_QUERY_LIMIT = config('REQUEST_METRICS_QUERY_LIMIT', default=30, cast=int)
+REQUEST_METRICS_REPEAT_THRESHOLD = config('REQUEST_METRICS_REPEAT_THRESHOLD', default=5, cast=int)
+
+# Cache shared by all worker processes on this machine, with a small
+# in-process tier in front (see config/cache.py)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'config.cache.TwoTierCache',
+        'LOCATION': config('CACHE_PATH', default=str(BASE_DIR / 'var' / 'cache.sqlite3')),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=50000, cast=int),
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=1000, cast=int),
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=5, cast=float),
+            'SYNC_INTERVAL': config('CACHE_SYNC_INTERVAL', default=0, cast=float),
+            'LOCK_TIMEOUT': config('CACHE_LOCK_TIMEOUT', default=10, cast=float),
+        },
     }
 }
+
+# `manage.py test` clears the cache freely, so it gets a throwaway cache file
+# rather than the one shared with the development server
+TESTING = sys.argv[1:2] == ['test']
+if TESTING:
+    TEST_CACHE_DIR = tempfile.mkdtemp(prefix='blog-test-cache-')
+    atexit.register(shutil.rmtree, TEST_CACHE_DIR, ignore_errors=True)
+    CACHES['default']['LOCATION'] = os.path.join(TEST_CACHE_DIR, 'cache.sqlite3')
+
+# Buffered post view counts (see apps/blog/view_counter.py)
+VIEW_COUNT_LOG_DIR = config('VIEW_COUNT_LOG_DIR', default=str(BASE_DIR / 'var' / 'viewcounts'))
+VIEW_COUNT_FLUSH_INTERVAL = config('VIEW_COUNT_FLUSH_INTERVAL', default=10, cast=float)
+
+# Daily dashboard statistics (see apps/blog/stats.py)
+STATS_ROLLUP_INTERVAL = config('STATS_ROLLUP_INTERVAL', default=300, cast=float)
+STATS_DASHBOARD_DAYS = config('STATS_DASHBOARD_DAYS', default=30, cast=int)
+
+# Full-page cache for anonymous visitors (see apps/blog/page_cache.py)
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=False, cast=bool)
+PAGE_CACHE_TIMEOUT = config('PAGE_CACHE_TIMEOUT', default=600, cast=int)
+
+# Email delivery; use django.core.mail.backends.filebased.EmailBackend with
+# EMAIL_FILE_PATH, or a local SMTP stand-in, to rehearse newsletter sends
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=str(BASE_DIR / 'var' / 'mail'))
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='webmaster@localhost')
+
+# Newsletter dispatch (see apps/blog/newsletter.py)
+NEWSLETTER_BATCH_SIZE = config('NEWSLETTER_BATCH_SIZE', default=100, cast=int)
+NEWSLETTER_WORKERS = config('NEWSLETTER_WORKERS', default=4, cast=int)
+
+# Resized image derivatives (see apps/blog/images.py)
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+IMAGE_VARIANT_QUALITY = config('IMAGE_VARIANT_QUALITY', default=80, cast=int)
+POST_IMAGE_WIDTHS = (480, 800, 1200, 1600)
+AVATAR_WIDTHS = (64, 128, 256)
+
+# Read-only JSON API (see apps/blog/api.py)
+API_CACHE_MAX_AGE = config('API_CACHE_MAX_AGE', default=60, cast=int)
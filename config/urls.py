@@ -7,9 +7,12 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # Before the Django admin, whose catch-all would otherwise swallow the
+    # blog's own admin/dashboard/, admin/posts/ and admin/export/ pages
     path('', include('apps.blog.urls', namespace='blog')),
+    path('admin/', admin.site.urls),
     path('accounts/', include('apps.accounts.urls', namespace='accounts')),
+    path('api/v1/', include('apps.blog.api_urls', namespace='api')),
 ]
 
 if settings.DEBUG: